@@ -0,0 +1,117 @@
+# match many input strings against one compiled DFA in a single pass.
+# with numpy available all inputs advance through the transition table together,
+# one column (character position) at a time; without numpy it falls back to
+# CompiledDFA.match per string. numpy is imported on the first match_batch call,
+# importing this module stays cheap.
+from itertools import islice
+from typing import Iterable, List
+
+from compiled_dfa import CompiledDFA
+
+np = None
+_numpy_checked = False
+
+def _import_numpy():
+    # numpy module, None if it is not installed (numpy is optional)
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np
+
+# inputs are consumed from the iterable in chunks of this many strings
+BATCH_SIZE = 65536
+
+def match_batch(compiled: CompiledDFA, strings: Iterable[str], batch_size: int = BATCH_SIZE):
+    # match every string of a list or stream, returns a numpy bool array
+    # (or a list of bools when numpy is not installed) in input order
+    iterator = iter(strings)
+    if _import_numpy() is None:
+        return [compiled.match(s) for s in iterator]
+
+    tables = _numpy_tables(compiled)
+    parts = []
+    while True:
+        chunk = list(islice(iterator, batch_size))
+        if not chunk:
+            break
+        parts.append(_match_chunk(tables, chunk))
+
+    if not parts:
+        return np.zeros(0, dtype=bool)
+    return np.concatenate(parts)
+
+def _numpy_tables(compiled: CompiledDFA):
+    # row-offset transition table, accept vector and symbol class lookups
+    offsets = np.frombuffer(compiled.table, dtype=np.intc).astype(np.int32)
+
+    bits = np.unpackbits(np.frombuffer(compiled.accept_bitmap, dtype=np.uint8), bitorder='little')
+    accepting = bits[:compiled.num_states].astype(bool)
+
+    byte_lookup = np.array(compiled.byte_classes, dtype=np.int32)
+    range_starts = np.array([lo for lo, _, _ in compiled.ranges], dtype=np.int64)
+    range_ends = np.array([hi for _, hi, _ in compiled.ranges], dtype=np.int64)
+    range_classes = np.array([klass for _, _, klass in compiled.ranges], dtype=np.int32)
+
+    return (compiled.start_state * compiled.num_classes, compiled.num_classes, offsets, accepting,
+            compiled.byte_translation, byte_lookup, range_starts, range_ends, range_classes)
+
+def _symbol_classes(tables, joined: str):
+    # class id of every character of the concatenated input, plus the positions of the NUL separators
+    byte_translation, byte_lookup, range_starts, range_ends, range_classes = tables[4:]
+    try:
+        encoded = joined.encode('latin-1')
+    except UnicodeEncodeError:
+        encoded = None
+
+    if encoded is not None:
+        separators = np.flatnonzero(np.frombuffer(encoded, dtype=np.uint8) == 0)
+        if byte_translation is not None:
+            return np.frombuffer(encoded.translate(byte_translation), dtype=np.uint8), separators
+        return byte_lookup[np.frombuffer(encoded, dtype=np.uint8)], separators
+
+    codepoints = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    separators = np.flatnonzero(codepoints == 0)
+    if len(range_starts) == 0:
+        return np.zeros(len(codepoints), dtype=np.int32), separators
+    index = np.searchsorted(range_starts, codepoints, side='right') - 1
+    clipped = np.maximum(index, 0)
+    inside = (index >= 0) & (codepoints <= range_ends[clipped])
+    return np.where(inside, range_classes[clipped], 0).astype(np.int32), separators
+
+def _match_chunk(tables, chunk: List[str]):
+    start_offset, num_classes, table, accepting = tables[:4]
+    n = len(chunk)
+
+    # inputs are joined with NUL separators, whose positions give every start and length
+    # without a len() call per string (unless an input itself contains NUL)
+    joined = '\0'.join(chunk)
+    classes, separators = _symbol_classes(tables, joined)
+    if len(separators) == n - 1:
+        starts = np.concatenate(([0], separators + 1))
+        lengths = np.concatenate((separators, [len(joined)])) - starts
+    else:
+        lengths = np.fromiter(map(len, chunk), dtype=np.int64, count=n)
+        starts = np.cumsum(lengths + 1) - lengths - 1
+
+    # longest strings first, so the strings still running at column j are a prefix
+    max_length = int(lengths.max())
+    keys = -lengths.astype(np.int16) if max_length < 32768 else -lengths  # int16 sorts by radix
+    order = np.argsort(keys, kind='stable')
+    sorted_lengths = lengths[order]
+    sorted_starts = starts[order]
+    active = np.searchsorted(-sorted_lengths, -np.arange(max_length), side='left')
+
+    # every input advances one character per step, states are kept as row offsets
+    states = np.full(n, start_offset, dtype=np.int32)
+    for column in range(max_length):
+        count = active[column]
+        states[:count] = table[states[:count] + classes[sorted_starts[:count] + column]]
+
+    result = np.empty(n, dtype=bool)
+    result[order] = accepting[states // num_classes]
+    return result
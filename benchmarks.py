@@ -0,0 +1,723 @@
+# timing benchmarks for the regex -> DFA pipeline
+# usage: python benchmarks.py [--json results.json] [benchmark_name ...]   (no names = run all)
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+from typing import Callable, Dict, List
+
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction, subset_construction_bitset, simulate_dfa
+from dfa_minimizer import minimize_dfa
+from batch_match import match_batch
+from pattern_cache import PatternCache, compile_regex
+from compiled_dfa import load_compiled
+from lazy_dfa import LazyDFA
+from matcher import build_matcher
+from stream_match import match_file
+from grep import compile_grep, grep_file
+from search import Searcher
+from regex_set import RegexSet
+from followpos_dfa import followpos_construction
+
+try:
+    import resource
+except ImportError:  # not available on Windows, peak RSS is then reported as None
+    resource = None
+
+SUITE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LFA-Assignment2_Regex_DFA_v2.json")
+
+BENCHMARKS: Dict[str, Callable[[], List[dict]]] = {}
+
+def benchmark(name: str):
+    # register a benchmark function, it returns a list of result rows (dicts)
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+def best_time(func: Callable, repeat: int = 3) -> float:
+    # best wall time out of `repeat` runs, in seconds
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def generated_pattern(length: int) -> str:
+    # concatenate small building blocks until the pattern reaches `length` symbols
+    blocks = ["(a|b)*c", "(ab|cd)+", "a?b", "((ab)*|(ba)*)c"]
+    parts = []
+    size = 0
+    i = 0
+    while size < length:
+        block = blocks[i % len(blocks)]
+        parts.append(block)
+        size += len(block)
+        i += 1
+    return ''.join(parts)
+
+@benchmark("thompson")
+def bench_thompson() -> List[dict]:
+    # NFA build time against pattern length, copying builder vs shared arena builder
+    rows = []
+    for length in (250, 500, 1000, 2000, 4000):
+        postfix = regex_to_postfix(generated_pattern(length))
+        copy_time = best_time(lambda: thompson_construction(postfix))
+        arena_time = best_time(lambda: thompson_construction(postfix, arena=True))
+        rows.append({
+            'length': len(postfix),
+            'copy_ms': copy_time * 1000,
+            'arena_ms': arena_time * 1000,
+            'arena_us_per_symbol': arena_time * 1e6 / len(postfix),
+        })
+    return rows
+
+@benchmark("match")
+def bench_match() -> List[dict]:
+    # matching throughput, dict-walking simulate_dfa vs the compiled transition table
+    rows = []
+    for regex, unit in (("(a|b)*abb", "ab"), ("(a|b|c)+", "abc"), ("(a(bc)*d)*", "abcbcd")):
+        dfa = subset_construction(thompson_construction(regex_to_postfix(regex), arena=True))
+        compiled = dfa.compile()
+        text = unit * (200000 // len(unit))
+        dict_time = best_time(lambda: simulate_dfa(dfa, text))
+        table_time = best_time(lambda: compiled.match(text))
+        rows.append({
+            'regex': regex,
+            'dict_mchars_s': len(text) / dict_time / 1e6,
+            'table_mchars_s': len(text) / table_time / 1e6,
+            'speedup': dict_time / table_time,
+        })
+    return rows
+
+@benchmark("minimize")
+def bench_minimize() -> List[dict]:
+    # state counts before/after Hopcroft minimization on the JSON suite
+    # (tests/test_minimize.py checks that both DFAs accept the same strings)
+    with open(SUITE_FILE, 'r') as f:
+        tests = json.load(f)
+
+    rows = []
+    for test in tests:
+        dfa = subset_construction(thompson_construction(regex_to_postfix(test['regex']), arena=True))
+        minimized = minimize_dfa(dfa)
+        rows.append({
+            'name': test['name'],
+            'regex': test['regex'],
+            'dfa_states': len(dfa.states),
+            'min_dfa_states': len(minimized.states),
+            'minimize_ms': best_time(lambda: minimize_dfa(dfa)) * 1000,
+        })
+    return rows
+
+@benchmark("batch")
+def bench_batch() -> List[dict]:
+    # short identifiers against one pattern: simulate_dfa and CompiledDFA.match per
+    # string vs match_batch, with alternations and with character classes
+    letters = "abcdefgh"
+    digits = "0123"
+    patterns = [("alternation", f"({'|'.join(letters)})({'|'.join(letters + digits)})*"),
+                ("class", "[a-h][a-h0-3]*")]
+
+    rng = random.Random(0)
+    rows = []
+    for shape, regex in patterns:
+        dfa = subset_construction(thompson_construction(regex_to_postfix(regex), arena=True))
+        compiled = dfa.compile()
+        # untimed first call: numpy is imported and the tables are built once per automaton
+        match_batch(compiled, ["a"])
+        for count in (256, 1024, 10000, 100000, 1000000):
+            # mostly valid identifiers, a few with a symbol outside the alphabet
+            inputs = [''.join(rng.choice(letters + digits) for _ in range(rng.randint(4, 16)))
+                      + ("x" if rng.random() < 0.05 else "") for _ in range(count)]
+            repeat = 3 if count <= 100000 else 1
+            loop_time = best_time(lambda: [simulate_dfa(dfa, s) for s in inputs], repeat)
+            match_time = best_time(lambda: [compiled.match(s) for s in inputs], repeat)
+            batch_time = best_time(lambda: match_batch(compiled, inputs), repeat)
+            rows.append({
+                'pattern': shape,
+                'inputs': count,
+                'loop_kstr_s': count / loop_time / 1000,
+                'match_kstr_s': count / match_time / 1000,
+                'batch_kstr_s': count / batch_time / 1000,
+                'speedup': loop_time / batch_time,
+                'speedup_vs_match': match_time / batch_time,
+            })
+    return rows
+
+@benchmark("cache")
+def bench_cache() -> List[dict]:
+    # a validator seeing the same few hundred patterns over and over
+    rng = random.Random(0)
+    patterns = [generated_pattern(rng.randint(10, 60)) + format(i, 'b') for i in range(300)]
+    requests = [rng.choice(patterns) for _ in range(5000)]
+
+    uncached_time = best_time(lambda: [compile_regex(p) for p in requests[:500]], repeat=1) * 10
+    cache = PatternCache(max_entries=256)
+    cached_time = best_time(lambda: [cache.get(p) for p in requests], repeat=1)
+    info = cache.info()
+    return [{
+        'requests': len(requests),
+        'uncached_s': uncached_time,
+        'cached_s': cached_time,
+        'hits': info.hits,
+        'misses': info.misses,
+        'evictions': info.evictions,
+    }]
+
+def blowup_pattern(n: int) -> str:
+    # (a|b)*a(a|b)^n needs 2^(n+1) DFA states
+    return "(a|b)*a" + "(a|b)" * n
+
+@benchmark("serialize")
+def bench_serialize() -> List[dict]:
+    # cold start: compiling a large automaton vs loading its saved form
+    rows = []
+    for n in (6, 9, 12):
+        regex = blowup_pattern(n)
+        compile_time = best_time(lambda: compile_regex(regex, minimize=False), repeat=1)
+        compiled = compile_regex(regex, minimize=False)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pattern.r2dfa")
+            compiled.save(path)
+            mmap_time = best_time(lambda: load_compiled(path))
+            read_time = best_time(lambda: load_compiled(path, use_mmap=False))
+            size = os.path.getsize(path)
+        rows.append({
+            'regex': f"(a|b)*a(a|b)^{n}",
+            'states': compiled.num_states,
+            'file_kb': size / 1024,
+            'compile_ms': compile_time * 1000,
+            'mmap_load_ms': mmap_time * 1000,
+            'read_load_ms': read_time * 1000,
+        })
+    return rows
+
+@benchmark("lazy")
+def bench_lazy() -> List[dict]:
+    # lazy DFA on patterns whose full DFA has 2^(n+1) states, with a bounded state cache
+    rng = random.Random(0)
+    texts = [''.join(rng.choice("ab") for _ in range(1000)) for _ in range(20)]
+    rows = []
+    for n in (8, 16, 24):
+        nfa = thompson_construction(regex_to_postfix(blowup_pattern(n)), arena=True)
+        lazy = LazyDFA(nfa, max_states=2000)
+        match_time = best_time(lambda: [lazy.match(text) for text in texts], repeat=1)
+        rows.append({
+            'regex': f"(a|b)*a(a|b)^{n}",
+            'full_dfa_states': 2 ** (n + 1),
+            'cached_states': lazy.cached_states,
+            'flushes': lazy.flushes,
+            'fallbacks': lazy.fallbacks,
+            'kchars_s': sum(map(len, texts)) / match_time / 1000,
+        })
+    return rows
+
+ALPHANUMERIC = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+def alternation(symbols: str) -> str:
+    return "(" + "|".join(symbols) + ")"
+
+@benchmark("subset")
+def bench_subset() -> List[dict]:
+    # set-based vs bitset subset construction as the alphabet grows
+    rows = []
+    for size in (4, 16, 36):
+        any_symbol = alternation(ALPHANUMERIC[:size])
+        regex = any_symbol + "*" + ALPHANUMERIC[0] + any_symbol * 6 + "(" + ALPHANUMERIC[:size // 2] + ")+"
+        nfa = thompson_construction(regex_to_postfix(regex), arena=True)
+        set_time = best_time(lambda: subset_construction(nfa), repeat=1)
+        bitset_time = best_time(lambda: subset_construction_bitset(nfa), repeat=1)
+        rows.append({
+            'alphabet': size,
+            'nfa_states': len(nfa.states),
+            'dfa_states': len(subset_construction_bitset(nfa).states),
+            'set_ms': set_time * 1000,
+            'bitset_ms': bitset_time * 1000,
+            'speedup': set_time / bitset_time,
+        })
+    return rows
+
+@benchmark("oneshot")
+def bench_oneshot() -> List[dict]:
+    # build + match time for a few inputs: NFA simulation vs DFA compilation vs auto
+    # accepts almost every string over abcd, so inputs are read to the end
+    regex = "((a|b)*c|(ab|cd)+|a?b|((ab)*|(ba)*)c|d)*" + "(a|b|c|d)" * 8
+    rng = random.Random(0)
+    rows = []
+    for count in (1, 10, 100, 1000):
+        inputs = [''.join(rng.choice("abcd") for _ in range(32)) for _ in range(count)]
+        times = {}
+        for engine in ('nfa', 'dfa', 'auto'):
+            def run():
+                matcher = build_matcher(regex, engine=engine, expected_inputs=count)
+                for text in inputs:
+                    matcher.match(text)
+            times[engine] = best_time(run, repeat=1)
+        rows.append({
+            'inputs': count,
+            'nfa_ms': times['nfa'] * 1000,
+            'dfa_ms': times['dfa'] * 1000,
+            'auto_ms': times['auto'] * 1000,
+        })
+    return rows
+
+@benchmark("stream")
+def bench_stream() -> List[dict]:
+    # whole-file matching through a memory map vs buffered reads
+    compiled = compile_regex("(a|b)*abb")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "payload.txt")
+        for megabytes in (4, 32):
+            with open(path, 'w') as f:
+                f.write("ab" * (megabytes * 1024 * 512 - 2) + "abb")
+            size = os.path.getsize(path)
+            mmap_time = best_time(lambda: match_file(compiled, path), repeat=1)
+            read_time = best_time(lambda: match_file(compiled, path, use_mmap=False), repeat=1)
+            rows.append({
+                'file_mb': size / 1e6,
+                'mmap_mb_s': size / mmap_time / 1e6,
+                'buffered_mb_s': size / read_time / 1e6,
+            })
+    return rows
+
+@benchmark("grep")
+def bench_grep() -> List[dict]:
+    # line scanning throughput on a generated log file
+    rng = random.Random(0)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log.txt")
+        with open(path, 'w') as f:
+            for _ in range(300000):
+                f.write(''.join(rng.choice("abcd") for _ in range(rng.randint(10, 60))) + "\n")
+        size = os.path.getsize(path)
+        # whole-line (-x): a selective pattern (most lines die after a few bytes) and one
+        # matching most lines; contains (the default): a substring found early in most lines
+        # and a rare one that keeps every line alive to its end
+        for regex, whole_line in (("ab(c|d)*", True), ("(a|b|c|d)*d", True), ("abc", False), ("dddddd", False)):
+            compiled = compile_grep(regex, whole_line)
+            scan_time = best_time(lambda: grep_file(compiled, path, collect=False), repeat=1)
+            rows.append({
+                'regex': regex,
+                'mode': 'line' if whole_line else 'contains',
+                'file_mb': size / 1e6,
+                'matching_lines': grep_file(compiled, path, collect=False).count,
+                'mb_s': size / scan_time / 1e6,
+            })
+    return rows
+
+def naive_search(compiled, text: str):
+    # slice the text at every offset and look for the longest anchored match there
+    for start in range(len(text) + 1):
+        longest = None
+        for end in range(len(text), start - 1, -1):
+            state = compiled.run(text[start:end])
+            if state and compiled.is_accepting(state):
+                longest = end
+                break
+        if longest is not None:
+            return start, longest
+    return None
+
+@benchmark("search")
+def bench_search() -> List[dict]:
+    # unanchored search (forward + reverse DFA) vs slicing at every offset
+    regex = "(a|b)*c"
+    compiled = compile_regex(regex)
+    searcher = Searcher(regex)
+    rows = []
+    for size in (100, 200, 400):
+        # the only match is the whole text, every offset reaches the end
+        text = "xy" * size + "ab" * size + "c"
+        naive_time = best_time(lambda: naive_search(compiled, text), repeat=1)
+        search_time = best_time(lambda: searcher.search(text))
+        assert naive_search(compiled, text) == searcher.search(text)
+        rows.append({
+            'text_length': len(text),
+            'naive_ms': naive_time * 1000,
+            'search_ms': search_time * 1000,
+            'speedup': naive_time / search_time,
+        })
+    return rows
+
+@benchmark("regexset")
+def bench_regexset() -> List[dict]:
+    # one pass over a combined automaton vs one simulate_dfa pass per pattern
+    rng = random.Random(0)
+    rows = []
+    for count in (10, 100, 300):
+        words = sorted({''.join(rng.choice("abcd") for _ in range(rng.randint(3, 8))) for _ in range(count)})
+        patterns = [word + rng.choice(["(a|b|c|d)*", "(ab)*", "c+d?", ""]) for word in words]
+        dfas = [subset_construction_bitset(thompson_construction(regex_to_postfix(p), arena=True))
+                for p in patterns]
+        regex_set = RegexSet(patterns)
+        inputs = [''.join(rng.choice("abcd") for _ in range(rng.randint(3, 20))) for _ in range(500)]
+
+        loop_time = best_time(lambda: [[simulate_dfa(dfa, text) for dfa in dfas] for text in inputs], repeat=1)
+        set_time = best_time(lambda: [regex_set.matches(text) for text in inputs])
+        rows.append({
+            'patterns': len(patterns),
+            'set_dfa_states': regex_set.dfa_states,
+            'loop_ms': loop_time * 1000,
+            'set_ms': set_time * 1000,
+            'speedup': loop_time / set_time,
+        })
+    return rows
+
+@benchmark("charclass")
+def bench_charclass() -> List[dict]:
+    # character classes as single range transitions vs the same classes spelled out
+    # as alternations of every character: NFA size and DFA build time
+    lower, upper, digits = ALPHANUMERIC[:26], ALPHANUMERIC[26:52], ALPHANUMERIC[52:]
+    rows = []
+    for classes, spelled in (
+        ("[a-z]+@[a-z]+", alternation(lower) + "+@" + alternation(lower) + "+"),
+        ("[a-z0-9]*x", alternation(lower + digits) + "*x"),
+        ("([A-Za-z][0-9])+", "(" + alternation(upper + lower) + alternation(digits) + ")+"),
+    ):
+        class_nfa = thompson_construction(regex_to_postfix(classes), arena=True)
+        spelled_nfa = thompson_construction(regex_to_postfix(spelled), arena=True)
+        class_time = best_time(lambda: subset_construction_bitset(class_nfa))
+        spelled_time = best_time(lambda: subset_construction_bitset(spelled_nfa))
+        rows.append({
+            'pattern': classes,
+            'class_nfa_states': len(class_nfa.states),
+            'spelled_nfa_states': len(spelled_nfa.states),
+            'class_ms': class_time * 1000,
+            'spelled_ms': spelled_time * 1000,
+            'speedup': spelled_time / class_time,
+        })
+    return rows
+
+@benchmark("repeat")
+def bench_repeat() -> List[dict]:
+    # counted repetition: \d{1,n} compiled by cloning the repeated fragment, against
+    # the hand expanded \d(\d(...)?)? built by the copying Thompson construction
+    rows = []
+    for n in (16, 64, 256, 512):
+        regex = f"[0-9]{{1,{n}}}"
+        expanded = "[0-9](" * (n - 1) + "[0-9]" + ")?" * (n - 1)
+        nfa = thompson_construction(regex_to_postfix(regex), arena=True)
+        compile_time = best_time(lambda: compile_regex(regex), repeat=1)
+        copy_time = best_time(lambda: thompson_construction(regex_to_postfix(expanded)), repeat=1)
+        dfa = minimize_dfa(subset_construction_bitset(nfa))
+        rows.append({
+            'n': n,
+            'nfa_states': len(nfa.states),
+            'min_dfa_states': len(dfa.states),
+            'compile_ms': compile_time * 1000,
+            'expanded_nfa_ms': copy_time * 1000,
+        })
+    return rows
+
+def peak_rss_kb():
+    # peak resident set size of this process so far, in KiB (None if unknown)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS
+
+# run in a fresh interpreter by case_rss_kb: peak RSS in KiB after the imports, then
+# after compiling the regex given as argv[1]. VmHWM where there is one, on Linux the
+# child's ru_maxrss starts at the RSS of the process that spawned it
+CASE_RSS_SCRIPT = """
+import resource, sys
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction
+
+def peak():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+before = peak()
+subset_construction(thompson_construction(regex_to_postfix(sys.argv[1]), arena=True))
+print(before, peak())
+"""
+
+def case_rss_kb(regex: str) -> tuple:
+    # (peak RSS of a fresh interpreter compiling regex, the part of it added by the
+    # compile) in KiB, (None, None) if unknown. One process per case, RUSAGE_SELF is a
+    # high-water mark and would report the largest case so far for every later one
+    if resource is None:
+        return None, None
+    completed = subprocess.run([sys.executable, "-c", CASE_RSS_SCRIPT, regex],
+                               cwd=PACKAGE_DIR, capture_output=True, text=True, check=True)
+    before, peak = map(int, completed.stdout.split())
+    return peak, peak - before
+
+def nested_pattern(depth: int) -> str:
+    # depth levels of starred groups, each adding one symbol: ((((a)*b)*c)*d)*
+    regex = ALPHANUMERIC[0]
+    for i in range(1, depth + 1):
+        regex = "(" + regex + ")*" + ALPHANUMERIC[i % len(ALPHANUMERIC)]
+    return regex
+
+def stage_corpus() -> List[tuple]:
+    # (shape, parameter, regex) growing along one dimension at a time
+    corpus = []
+    for length in (50, 200, 800):
+        corpus.append(("length", length, generated_pattern(length)))
+    for size in (2, 8, 32):
+        any_symbol = alternation(ALPHANUMERIC[:size])
+        corpus.append(("alphabet", size, any_symbol + "*" + ALPHANUMERIC[0] + any_symbol * 3))
+    for depth in (2, 8, 32):
+        corpus.append(("nesting", depth, nested_pattern(depth)))
+    for n in (4, 8, 11):
+        corpus.append(("blowup", n, blowup_pattern(n)))
+    return corpus
+
+@benchmark("stages")
+def bench_stages() -> List[dict]:
+    # every pipeline stage timed separately over a generated corpus:
+    # regex_to_postfix, thompson_construction, subset_construction, simulate_dfa
+    rng = random.Random(0)
+    rows = []
+    for shape, parameter, regex in stage_corpus():
+        # memory measured first and in a child process, this process's high-water mark
+        # covers every earlier case
+        case_peak_kb, compile_kb = case_rss_kb(regex)
+        postfix = regex_to_postfix(regex)
+        nfa = thompson_construction(postfix, arena=True)
+        dfa = subset_construction(nfa)
+        # random strings over the pattern's alphabet, one op is one simulate_dfa call
+        symbols = sorted(dfa.alphabet)
+        inputs = [''.join(rng.choice(symbols) for _ in range(64)) for _ in range(200)]
+
+        postfix_time = best_time(lambda: regex_to_postfix(regex))
+        thompson_time = best_time(lambda: thompson_construction(postfix, arena=True))
+        subset_time = best_time(lambda: subset_construction(nfa), repeat=1)
+        simulate_time = best_time(lambda: [simulate_dfa(dfa, text) for text in inputs], repeat=1)
+        rows.append({
+            'shape': shape,
+            'parameter': parameter,
+            'regex_length': len(regex),
+            'nfa_states': len(nfa.states),
+            'nfa_transitions': sum(len(targets) for state in nfa.states for targets in state.transitions.values()),
+            'dfa_states': len(dfa.states),
+            'dfa_transitions': sum(len(state.transitions) for state in dfa.states),
+            'postfix_ops_s': 1 / postfix_time,
+            'thompson_ops_s': 1 / thompson_time,
+            'subset_ops_s': 1 / subset_time,
+            'simulate_ops_s': len(inputs) / simulate_time,
+            'peak_rss_kb': case_peak_kb,
+            'compile_rss_kb': compile_kb,
+        })
+    return rows
+
+def nested_alternation(depth: int) -> str:
+    # depth levels of starred alternations: ((((a|b)*c|d)*e|f)*...)
+    regex = "a|b"
+    for i in range(depth):
+        regex = "(" + regex + ")*" + ALPHANUMERIC[(2 * i + 2) % 26] + "|" + ALPHANUMERIC[(2 * i + 3) % 26]
+    return regex
+
+def dfa_shape(dfa) -> tuple:
+    # minimized DFAs are numbered breadth-first over the sorted alphabet, so two
+    # equivalent DFAs minimize to the same shape
+    minimized = minimize_dfa(dfa)
+    return ([sorted((str(symbol), target) for symbol, target in state.transitions.items())
+             for state in minimized.states], sorted(minimized.accepting_states))
+
+@benchmark("followpos")
+def bench_followpos() -> List[dict]:
+    # direct followpos construction vs Thompson NFA + bitset subset construction
+    # on deeply nested and counted ({m}, {m,}, {m,n}) patterns, checking that both
+    # DFAs are equivalent
+    rows = []
+    for shape, depth, regex in (
+        [("stars", depth, nested_pattern(depth)) for depth in (8, 32, 128)] +
+        [("alternation", depth, nested_alternation(depth)) for depth in (4, 12, 24)] +
+        [("length", length, generated_pattern(length)) for length in (200, 800)] +
+        [("counted", n, f"(a|bc){{{n}}}x{{2,}}[0-9]{{1,{n}}}(ab|c){{0,{n}}}") for n in (4, 16, 64)]
+    ):
+        postfix = regex_to_postfix(regex)
+        thompson_dfa = subset_construction_bitset(thompson_construction(postfix, arena=True))
+        followpos = followpos_construction(postfix)
+        if dfa_shape(thompson_dfa) != dfa_shape(followpos):
+            raise AssertionError(f"followpos DFA is not equivalent on {regex!r}")
+        thompson_time = best_time(lambda: subset_construction_bitset(thompson_construction(postfix, arena=True)))
+        followpos_time = best_time(lambda: followpos_construction(postfix))
+        rows.append({
+            'shape': shape,
+            'depth': depth,
+            'thompson_ms': thompson_time * 1000,
+            'followpos_ms': followpos_time * 1000,
+            'speedup': thompson_time / followpos_time,
+            'thompson_states': len(thompson_dfa.states),
+            'followpos_states': len(followpos.states),
+            'min_states': len(minimize_dfa(followpos).states),
+        })
+    return rows
+
+def escaped_pattern(length: int) -> str:
+    # machine generated style: classes, escapes and counted repetition
+    blocks = ["[a-z0-9_]+", "\\.", "\\d{1,3}", "(\\w|-)*", "[^\\s,]{2,}", "\\(x\\)?"]
+    parts = []
+    size = 0
+    while size < length:
+        block = blocks[len(parts) % len(blocks)]
+        parts.append(block)
+        size += len(block)
+    return ''.join(parts)
+
+@benchmark("parse")
+def bench_parse() -> List[dict]:
+    # regex_to_postfix throughput on long generated patterns
+    rows = []
+    for shape, make in (("plain", generated_pattern), ("escaped", escaped_pattern)):
+        for length in (1000, 10000, 100000):
+            regex = make(length)
+            parse_time = best_time(lambda: regex_to_postfix(regex))
+            rows.append({
+                'shape': shape,
+                'length': len(regex),
+                'tokens': len(regex_to_postfix(regex)),
+                'parse_ms': parse_time * 1000,
+                'msymbols_s': len(regex) / parse_time / 1e6,
+            })
+    return rows
+
+def deep_sizeof(obj, seen=None) -> int:
+    # bytes held by obj and everything it references (containers, __slots__ and
+    # __dict__ attributes); ints, strs and shared objects are not counted
+    if seen is None:
+        seen = set()
+    if obj is None or isinstance(obj, (bool, int, float, str)) or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif not isinstance(obj, (array, bytes, bytearray, memoryview)):
+        if hasattr(obj, '__dict__'):
+            size += deep_sizeof(obj.__dict__, seen)
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                size += deep_sizeof(getattr(obj, slot, None), seen)
+    return size
+
+@benchmark("memory")
+def bench_memory() -> List[dict]:
+    # bytes per state of the NFA (State objects vs CSR arrays) and of the DFA
+    # (with the NFA subsets kept, discarded, and compiled to a table)
+    rows = []
+    for regex in ("(a|b)*a(a|b){8}", "[a-z]+@[a-z]+\\.(com|org)", "((a|b)*c|(ab|cd)+|a?b)*(a|b|c|d){6}"):
+        nfa = thompson_construction(regex_to_postfix(regex), arena=True)
+        dfa = subset_construction_bitset(nfa)
+        lean_dfa = subset_construction_bitset(nfa, keep_subsets=False)
+        nfa_states = len(nfa.states)
+        dfa_states = len(dfa.states)
+        rows.append({
+            'pattern': regex,
+            'nfa_states': nfa_states,
+            'nfa_b_state': deep_sizeof(nfa) / nfa_states,
+            'compact_nfa_b_state': deep_sizeof(nfa.compact()) / nfa_states,
+            'dfa_states': dfa_states,
+            'dfa_b_state': deep_sizeof(dfa) / dfa_states,
+            'no_subsets_b_state': deep_sizeof(lean_dfa) / dfa_states,
+            'compiled_b_state': deep_sizeof(lean_dfa.compile()) / dfa_states,
+        })
+    return rows
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def import_time(module: str) -> tuple:
+    # (wall seconds of a fresh interpreter importing module, cumulative import time of
+    # the module in microseconds as reported by -X importtime)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=PACKAGE_DIR, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    cumulative = 0
+    for line in completed.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1].split()[-1])
+    return wall, cumulative
+
+@benchmark("importtime")
+def bench_importtime() -> List[dict]:
+    # startup cost of short-lived processes: a fresh interpreter importing one module
+    # (wall time includes the interpreter start, baseline_ms is `python -c pass`)
+    baseline = min(import_time("sys")[0] for _ in range(5))
+    rows = []
+    for module in ("nfa_to_dfa", "pattern_cache", "matcher", "search", "main", "visualize"):
+        runs = [import_time(module) for _ in range(5)]
+        rows.append({
+            'module': module,
+            'baseline_ms': baseline * 1000,
+            'wall_ms': min(wall for wall, _ in runs) * 1000,
+            'import_ms': min(cumulative for _, cumulative in runs) / 1000,
+        })
+    return rows
+
+def print_rows(name: str, rows: List[dict]):
+    print(f"\n== {name} ==")
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    print("  ".join(f"{col:>20}" for col in columns))
+    for row in rows:
+        cells = []
+        for col in columns:
+            value = row[col]
+            if isinstance(value, float):
+                cells.append(f"{value:>20.3f}")
+            else:
+                cells.append(f"{str(value):>20}")
+        print("  ".join(cells))
+
+def write_json(path: str, results: Dict[str, List[dict]]):
+    # machine readable results, to compare runs between releases
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'peak_rss_kb': peak_rss_kb(),
+        },
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Timing benchmarks for the regex -> DFA pipeline")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON to PATH")
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+
+    results = {}
+    for name in names:
+        results[name] = BENCHMARKS[name]()
+        print_rows(name, results[name])
+    if args.json:
+        write_json(args.json, results)
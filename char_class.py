@@ -0,0 +1,171 @@
+# character classes ([a-z], ., \d, ...) as sets of codepoint ranges.
+# a class reaches the NFA as a single transition labelled with a CharSet; single
+# characters keep using plain str labels. Subset construction then works over the
+# disjoint equivalence classes (atoms) of all labels instead of single characters.
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+# label of epsilon transitions (re-exported by nfa_builder)
+EPSILON = 'ε'
+
+MAX_CODEPOINT = 0x10FFFF
+
+class CharSet:
+    # immutable set of characters, stored as sorted disjoint (first, last) codepoint ranges
+    __slots__ = ('ranges', '_starts', '_hash')
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]]):
+        merged: List[Tuple[int, int]] = []
+        for lo, hi in sorted(ranges):
+            if merged and lo <= merged[-1][1] + 1:
+                if hi > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], hi)
+            else:
+                merged.append((lo, hi))
+        self.ranges: Tuple[Tuple[int, int], ...] = tuple(merged)
+        self._starts = [lo for lo, _ in merged]
+        self._hash = hash(self.ranges)
+
+    @classmethod
+    def of(cls, chars: str) -> 'CharSet':
+        return cls((ord(c), ord(c)) for c in chars)
+
+    def __contains__(self, char: str) -> bool:
+        codepoint = ord(char)
+        i = bisect_right(self._starts, codepoint) - 1
+        return i >= 0 and codepoint <= self.ranges[i][1]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CharSet) and self.ranges == other.ranges
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __len__(self) -> int:
+        return sum(hi - lo + 1 for lo, hi in self.ranges)
+
+    def __str__(self) -> str:
+        def show(codepoint: int) -> str:
+            char = chr(codepoint)
+            return char if char.isprintable() and char not in '\\]-^' else f"\\x{{{codepoint:x}}}"
+        parts = [show(lo) if lo == hi else f"{show(lo)}-{show(hi)}" for lo, hi in self.ranges]
+        return "[" + "".join(parts) + "]"
+
+    __repr__ = __str__
+
+    @property
+    def first(self) -> int:
+        return self.ranges[0][0]
+
+    def union(self, other: 'CharSet') -> 'CharSet':
+        return CharSet(self.ranges + other.ranges)
+
+    def negate(self) -> 'CharSet':
+        ranges = []
+        previous = 0
+        for lo, hi in self.ranges:
+            if lo > previous:
+                ranges.append((previous, lo - 1))
+            previous = hi + 1
+        if previous <= MAX_CODEPOINT:
+            ranges.append((previous, MAX_CODEPOINT))
+        return CharSet(ranges)
+
+DIGIT = CharSet([(ord('0'), ord('9'))])
+WORD = CharSet([(ord('0'), ord('9')), (ord('A'), ord('Z')), (ord('a'), ord('z')), (ord('_'), ord('_'))])
+SPACE = CharSet.of(" \t\n\r\f\v")
+ANY = CharSet([(0, MAX_CODEPOINT)])
+
+# \d, \w, \s and their negations
+CLASS_ESCAPES: Dict[str, CharSet] = {
+    'd': DIGIT, 'w': WORD, 's': SPACE,
+    'D': DIGIT.negate(), 'W': WORD.negate(), 'S': SPACE.negate(),
+}
+
+Symbol = Union[str, CharSet]
+
+def symbol_label(charset: CharSet) -> Symbol:
+    # transition label for a set of characters: a plain str for a single character
+    # (the epsilon character excepted, it would read as an epsilon move), else the set
+    if len(charset.ranges) == 1 and charset.ranges[0][0] == charset.ranges[0][1]:
+        char = chr(charset.first)
+        if char != EPSILON:
+            return char
+    return charset
+
+def as_charset(symbol: Symbol) -> CharSet:
+    return symbol if isinstance(symbol, CharSet) else CharSet.of(symbol)
+
+def symbol_sort_key(symbol: Symbol) -> Tuple[int, int]:
+    # orders str and CharSet labels together, by first codepoint
+    if isinstance(symbol, CharSet):
+        return symbol.first, 1
+    return ord(symbol), 0
+
+def symbol_ranges(symbol: Symbol) -> Tuple[Tuple[int, int], ...]:
+    if isinstance(symbol, CharSet):
+        return symbol.ranges
+    return ((ord(symbol), ord(symbol)),)
+
+def partition(labels: Sequence[Symbol]) -> List[Tuple[Symbol, List[int]]]:
+    # split the characters covered by the labels into disjoint equivalence classes
+    # (atoms): two characters are in the same atom iff exactly the same labels contain
+    # them. Returns (atom label, indexes of the labels containing it) in codepoint order
+    events: Dict[int, List[Tuple[int, int]]] = {}
+    for index, label in enumerate(labels):
+        for lo, hi in symbol_ranges(label):
+            events.setdefault(lo, []).append((index, 1))
+            events.setdefault(hi + 1, []).append((index, -1))
+
+    atoms: Dict[Tuple[int, ...], List[Tuple[int, int]]] = {}
+    active: Dict[int, int] = {}
+    boundaries = sorted(events)
+    for i, boundary in enumerate(boundaries):
+        for index, delta in events[boundary]:
+            count = active.get(index, 0) + delta
+            if count:
+                active[index] = count
+            else:
+                del active[index]
+        if active and i + 1 < len(boundaries):
+            signature = tuple(sorted(active))
+            atoms.setdefault(signature, []).append((boundary, boundaries[i + 1] - 1))
+
+    result = [(symbol_label(CharSet(ranges)), list(signature)) for signature, ranges in atoms.items()]
+    result.sort(key=lambda item: symbol_sort_key(item[0]))
+    return result
+
+def symbol_classes(labels: Iterable[Symbol]) -> Dict[Symbol, List[Symbol]]:
+    # DFA symbol -> NFA labels it follows. With only single characters every label
+    # is its own symbol, otherwise the symbols are the atoms of all labels
+    labels = list(labels)
+    if all(isinstance(label, str) for label in labels):
+        return {label: [label] for label in labels}
+    return {atom: [labels[i] for i in covering] for atom, covering in partition(labels)}
+
+class SymbolMap:
+    # maps a character to the value of the symbol (str or CharSet) containing it,
+    # for a dict of disjoint symbols such as a DFA alphabet or symbol_classes()
+    def __init__(self, values: Dict[Symbol, object]):
+        self.chars: Dict[str, object] = {}
+        self._ranges: List[Tuple[int, int, object]] = []
+        for symbol, value in values.items():
+            if isinstance(symbol, CharSet):
+                for lo, hi in symbol.ranges:
+                    self._ranges.append((lo, hi, value))
+            else:
+                self.chars[symbol] = value
+        self._ranges.sort(key=lambda r: r[0])
+        self._starts = [lo for lo, _, _ in self._ranges]
+        self.has_ranges = bool(self._ranges)
+
+    def lookup(self, char: str):
+        # value of the symbol containing char, None if no symbol does
+        value = self.chars.get(char)
+        if value is not None or not self._ranges:
+            return value
+        codepoint = ord(char)
+        i = bisect_right(self._starts, codepoint) - 1
+        if i >= 0 and codepoint <= self._ranges[i][1]:
+            return self._ranges[i][2]
+        return None
@@ -0,0 +1,212 @@
+# compact array-backed form of a DFA, used for fast matching.
+# symbols are mapped to dense integer classes and all transitions live in one
+# flat array('i') table indexed by state * num_classes + symbol_class. Entries hold
+# the row offset (state * num_classes) of the next state so the matcher loop only
+# needs one add and one index per symbol.
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from char_class import Symbol, symbol_ranges, symbol_sort_key
+
+# state 0 is an explicit dead (trap) state: every transition out of it leads back to it
+DEAD_STATE = 0
+# class 0 collects every symbol outside the alphabet, it always leads to the dead state
+OTHER_CLASS = 0
+
+# on-disk format (little endian):
+#   header  magic, version, num_states, num_classes, start_state, num_ranges, 2 reserved words
+#   ranges  num_ranges x (first codepoint, last codepoint, class) as uint32
+#   table   num_states * num_classes int32 row offsets
+#   accept  accept bitmap, (num_states + 7) // 8 bytes
+# every section starts on a 4 byte boundary so the table can be used in place
+FORMAT_MAGIC = b'R2DFA\x00'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<6sHIIIIII')
+_RANGE = struct.Struct('<III')
+
+class CompiledDFA:
+    def __init__(self, num_states: int, num_classes: int, start_state: int,
+                 table, accept_bitmap, ranges: List[Tuple[int, int, int]]):
+        self.num_states = num_states            # including the dead state
+        self.num_classes = num_classes          # including OTHER_CLASS
+        self.start_state = start_state
+        self.table = table                      # flat row-offset table (array('i') or int memoryview)
+        self.accept_bitmap = accept_bitmap      # bit `state` is set if the state is accepting
+        self.ranges = ranges                    # sorted (first codepoint, last codepoint, class)
+        self._build_lookups()
+
+    def _build_lookups(self):
+        # str symbols -> class, filled for all short ranges, wide ranges are looked up with bisect
+        self.symbol_classes: Dict[str, int] = {}
+        for lo, hi, cls in self.ranges:
+            if hi - lo < 256:
+                for codepoint in range(lo, hi + 1):
+                    self.symbol_classes[chr(codepoint)] = cls
+        self._range_starts = [lo for lo, _, _ in self.ranges]
+
+        # bytes input is treated as latin-1, one class per byte value
+        self.byte_classes = [self.class_of(chr(b)) for b in range(256)]
+        # bytes.translate table turning input bytes into class ids in C
+        self.byte_translation = bytes(self.byte_classes) if self.num_classes < 256 else None
+
+    @classmethod
+    def from_dfa(cls, dfa) -> 'CompiledDFA':
+        # build the compiled form of a DFA returned by subset_construction
+        num_states = len(dfa.states) + 1  # +1 for the dead state
+        symbols = sorted(dfa.alphabet, key=symbol_sort_key)
+
+        # symbols whose columns are identical behave the same and share one class
+        column_class: Dict[Tuple[int, ...], int] = {}
+        symbol_class: Dict[Symbol, int] = {}
+        for symbol in symbols:
+            column = tuple(state.transitions.get(symbol, -1) for state in dfa.states)
+            if column not in column_class:
+                column_class[column] = len(column_class) + 1
+            symbol_class[symbol] = column_class[column]
+        num_classes = len(column_class) + 1
+
+        table = array('i', bytes(4 * num_states * num_classes))
+        for i, state in enumerate(dfa.states):
+            row = (i + 1) * num_classes
+            for symbol, dest in state.transitions.items():
+                table[row + symbol_class[symbol]] = (dest + 1) * num_classes
+
+        accept_bitmap = bytearray((num_states + 7) // 8)
+        for state in dfa.accepting_states:
+            accept_bitmap[(state + 1) >> 3] |= 1 << ((state + 1) & 7)
+
+        # merge consecutive codepoints of the same class into ranges
+        # (character class symbols bring whole ranges of codepoints)
+        symbol_ranges_by_start = sorted((lo, hi, symbol_class[symbol])
+                                        for symbol in symbols for lo, hi in symbol_ranges(symbol))
+        ranges: List[Tuple[int, int, int]] = []
+        for lo, hi, klass in symbol_ranges_by_start:
+            if ranges and ranges[-1][1] == lo - 1 and ranges[-1][2] == klass:
+                ranges[-1] = (ranges[-1][0], hi, klass)
+            else:
+                ranges.append((lo, hi, klass))
+
+        return cls(num_states, num_classes, dfa.start_state + 1, table, bytes(accept_bitmap), ranges)
+
+    def class_of(self, symbol: str) -> int:
+        klass = self.symbol_classes.get(symbol)
+        if klass is not None:
+            return klass
+        codepoint = ord(symbol)
+        i = bisect_right(self._range_starts, codepoint) - 1
+        if i >= 0 and codepoint <= self.ranges[i][1]:
+            return self.ranges[i][2]
+        return OTHER_CLASS
+
+    def is_accepting(self, state: int) -> bool:
+        return (self.accept_bitmap[state >> 3] >> (state & 7)) & 1 == 1
+
+    def classes_of(self, text):
+        # class id of every symbol of text (str or bytes), as bytes when the classes fit
+        if isinstance(text, str):
+            try:
+                text = text.encode('latin-1')
+            except UnicodeEncodeError:
+                return [self.class_of(char) for char in text]
+        elif isinstance(text, memoryview):
+            text = text.tobytes()
+
+        if self.byte_translation is not None:
+            return text.translate(self.byte_translation)
+        byte_classes = self.byte_classes
+        return [byte_classes[b] for b in text]
+
+    def run(self, text, state: Optional[int] = None) -> int:
+        # final state after reading text (str or bytes) from `state` (default: the start state),
+        # stops early in the dead state
+        if isinstance(text, str):
+            try:
+                text = text.encode('latin-1')
+            except UnicodeEncodeError:
+                return self._run_symbols(text, state)
+
+        classes = self.classes_of(text)
+        table = self.table
+        offset = (self.start_state if state is None else state) * self.num_classes
+        for klass in classes:
+            offset = table[offset + klass]
+            if offset == 0:
+                return DEAD_STATE
+        return offset // self.num_classes
+
+    def _run_symbols(self, text: str, state: Optional[int] = None) -> int:
+        # slower path for str input outside latin-1, classes looked up per character
+        table = self.table
+        get_class = self.symbol_classes.get
+        offset = (self.start_state if state is None else state) * self.num_classes
+        for char in text:
+            klass = get_class(char)
+            if klass is None:
+                klass = self.class_of(char)
+            offset = table[offset + klass]
+            if offset == 0:
+                return DEAD_STATE
+        return offset // self.num_classes
+
+    def match(self, text) -> bool:
+        # True if the whole text is accepted
+        return self.is_accepting(self.run(text))
+
+    def to_bytes(self) -> bytes:
+        # serialize to the versioned binary format described above
+        header = _HEADER.pack(FORMAT_MAGIC, FORMAT_VERSION, self.num_states, self.num_classes,
+                              self.start_state, len(self.ranges), 0, 0)
+        ranges = b''.join(_RANGE.pack(lo, hi, klass) for lo, hi, klass in self.ranges)
+        table = array('i', self.table)
+        if sys.byteorder != 'little':
+            table.byteswap()
+        return header + ranges + table.tobytes() + bytes(self.accept_bitmap)
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def from_buffer(cls, buffer) -> 'CompiledDFA':
+        # load from any buffer (bytes, mmap, ...), the table and accept bitmap are used in place
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise ValueError("Invalid compiled DFA: truncated header")
+        magic, version, num_states, num_classes, start_state, num_ranges, _, _ = _HEADER.unpack_from(view, 0)
+        if magic != FORMAT_MAGIC:
+            raise ValueError("Invalid compiled DFA: bad magic")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled DFA format version: {version}")
+
+        ranges_start = _HEADER.size
+        table_start = ranges_start + num_ranges * _RANGE.size
+        accept_start = table_start + 4 * num_states * num_classes
+        end = accept_start + (num_states + 7) // 8
+        if len(view) < end:
+            raise ValueError("Invalid compiled DFA: truncated data")
+
+        ranges = [_RANGE.unpack_from(view, ranges_start + i * _RANGE.size) for i in range(num_ranges)]
+        table = view[table_start:accept_start]
+        if sys.byteorder == 'little' and array('i').itemsize == 4:
+            table = table.cast('i')
+        else:
+            table = array('i', table.tobytes())
+            if sys.byteorder != 'little':
+                table.byteswap()
+
+        return cls(num_states, num_classes, start_state, table, view[accept_start:end], ranges)
+
+def load_compiled(path: str, use_mmap: bool = True) -> CompiledDFA:
+    # load a compiled DFA saved with CompiledDFA.save. With use_mmap the file is
+    # memory-mapped read-only, so processes loading the same file share its page cache
+    with open(path, 'rb') as f:
+        if not use_mmap:
+            return CompiledDFA.from_buffer(f.read())
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    compiled = CompiledDFA.from_buffer(mapped)
+    compiled._mapping = mapped  # keep the mapping alive as long as the automaton
+    return compiled
@@ -0,0 +1,123 @@
+# DFA minimization using Hopcroft's partition refinement algorithm, O(n * |alphabet| * log n)
+from typing import Dict, FrozenSet, List, Set, Tuple
+from nfa_to_dfa import DFA
+from char_class import symbol_sort_key
+
+def minimize_dfa(dfa: DFA) -> DFA:
+    # returns an equivalent DFA with the minimum number of states,
+    # renumbered canonically (breadth first from the start state, symbols in sorted order)
+    n = len(dfa.states)
+    dead = n  # extra trap state so the transition function is complete
+    alphabet = sorted(dfa.alphabet, key=symbol_sort_key)
+
+    # complete transition function and its inverse, per symbol index
+    delta: List[List[int]] = []
+    for state in dfa.states:
+        delta.append([state.transitions.get(symbol, dead) for symbol in alphabet])
+    delta.append([dead] * len(alphabet))
+
+    inverse: List[List[List[int]]] = [[[] for _ in range(n + 1)] for _ in alphabet]
+    for source, row in enumerate(delta):
+        for a, target in enumerate(row):
+            inverse[a][target].append(source)
+
+    # initial partition: accepting / non-accepting (the dead state is non-accepting),
+    # accepting states are further split by the pattern ids they report (see RegexSet)
+    accepting = set(dfa.accepting_states)
+    initial: Dict[FrozenSet[int], Set[int]] = {}
+    for state in accepting:
+        initial.setdefault(dfa.states[state].match_ids, set()).add(state)
+    rejecting = set(range(n + 1)) - accepting
+    blocks: List[Set[int]] = [block for block in list(initial.values()) + [rejecting] if block]
+    # size of every block when its set was (re)built: sets never shrink their table on
+    # removals, a block left with a quarter of it is copied so iterating it stays cheap
+    built = [len(block) for block in blocks]
+    block_of = [0] * (n + 1)
+    for b, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = b
+
+    # worklist of (block, symbol) splitters, every initial block but the largest is needed
+    largest = max(range(len(blocks)), key=lambda b: len(blocks[b]))
+    worklist: List[Tuple[int, int]] = [(b, a) for b in range(len(blocks)) if b != largest
+                                       for a in range(len(alphabet))]
+
+    while worklist:
+        splitter, a = worklist.pop()
+
+        # states with an `a` transition into the splitter, grouped by their block
+        touched: Dict[int, Set[int]] = {}
+        for target in blocks[splitter]:
+            for source in inverse[a][target]:
+                touched.setdefault(block_of[source], set()).add(source)
+
+        for b, inside in touched.items():
+            if len(inside) == len(blocks[b]):
+                continue  # block is not split
+
+            # only the touched states are removed and only the smaller half is
+            # relabeled, a split costs O(|inside|) and never the size of the block
+            outside = blocks[b]
+            outside.difference_update(inside)
+            outside_built = built[b]
+            if 4 * len(outside) < outside_built:
+                outside = set(outside)
+                outside_built = len(outside)
+            if len(inside) <= len(outside):
+                blocks[b], built[b] = outside, outside_built
+                small = inside
+                built.append(len(inside))
+            else:
+                blocks[b], built[b] = inside, len(inside)
+                small = outside
+                built.append(outside_built)
+            new_block = len(blocks)
+            blocks.append(small)
+            for state in small:
+                block_of[state] = new_block
+
+            # if (b, c) is still pending both halves get processed, otherwise only
+            # the smaller half is needed: either way that is (new_block, c)
+            for c in range(len(alphabet)):
+                worklist.append((new_block, c))
+
+    # build the minimized DFA, dropping the block of the dead state
+    dead_block = block_of[dead]
+    minimized = DFA()
+    start_block = block_of[dfa.start_state]
+
+    if start_block == dead_block:
+        # empty language, a single rejecting start state
+        minimized.add_state(set())
+        return minimized
+
+    def merged_nfa_states(block: int) -> Set[int]:
+        merged: Set[int] = set()
+        for state in blocks[block]:
+            if state != dead:
+                merged.update(dfa.states[state].nfa_states)
+        return merged
+
+    new_index = {start_block: minimized.add_state(merged_nfa_states(start_block))}
+    queue = [start_block]
+    head = 0
+    while head < len(queue):
+        block = queue[head]
+        head += 1
+        representative = next(iter(blocks[block]))
+        current = new_index[block]
+
+        if representative in accepting:
+            minimized.mark_accepting(current)
+            minimized.states[current].match_ids = dfa.states[representative].match_ids
+
+        for a, symbol in enumerate(alphabet):
+            target_block = block_of[delta[representative][a]]
+            if target_block == dead_block:
+                continue
+            if target_block not in new_index:
+                new_index[target_block] = minimized.add_state(merged_nfa_states(target_block))
+                queue.append(target_block)
+            minimized.add_transition(current, symbol, new_index[target_block])
+
+    return minimized
@@ -0,0 +1,197 @@
+# direct regex -> DFA construction (Aho, Sethi, Ullman) from the postfix syntax tree,
+# without an NFA. Every operand occurrence is a position; nullable, firstpos and
+# lastpos are computed bottom-up and followpos(p) is the set of positions that can
+# come right after p. A DFA state is a set of positions (the ones that can match the
+# next character), so there is no epsilon closure to compute.
+# Position sets are integer bitmasks, like in subset_construction_bitset.
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from char_class import EPSILON, Symbol, symbol_classes, symbol_sort_key
+from nfa_builder import operand_label
+from nfa_to_dfa import DFA, NO_SUBSET, Budget, check_budget, mask_to_set
+from regex_to_postfix import Repeat, is_operand
+
+# (nullable, firstpos, lastpos, first position owned) of a subexpression; like the
+# arena fragments, a subexpression owns the contiguous positions [low, len(labels))
+Node = Tuple[bool, int, int, int]
+
+class PositionTree:
+    # positions of a postfix expression: labels[p] is the label of position p and
+    # follow[p] the followpos bitmask of p
+    def __init__(self):
+        self.labels: List[Symbol] = []
+        self.follow: List[int] = []
+
+    def position(self, label: Symbol) -> Node:
+        low = len(self.labels)
+        self.labels.append(label)
+        self.follow.append(0)
+        return False, 1 << low, 1 << low, low
+
+    def chain(self, last: int, first: int):
+        # every position of `last` can be followed by every position of `first`
+        follow = self.follow
+        while last:
+            low = last & -last
+            last ^= low
+            follow[low.bit_length() - 1] |= first
+
+    def concat(self, left: Node, right: Node) -> Node:
+        nullable1, first1, last1, low = left
+        nullable2, first2, last2, _ = right
+        self.chain(last1, first2)
+        return (nullable1 and nullable2,
+                first1 | first2 if nullable1 else first1,
+                last1 | last2 if nullable2 else last2,
+                low)
+
+    def clone(self, node: Node, high: int) -> Node:
+        # copy of the positions [low, high) of node, its followpos sets stay inside the copy
+        nullable, first, last, low = node
+        shift = len(self.labels) - low
+        for p in range(low, high):
+            self.labels.append(self.labels[p])
+            self.follow.append(self.follow[p] << shift)
+        return nullable, first << shift, last << shift, low + shift
+
+    def repeat(self, node: Node, minimum: int, maximum: Optional[int]) -> Node:
+        # X{m,n} as m copies of X followed by n - m nested optional copies X(X(X)?)?
+        # (X{m,} makes the last copy loop), the same expansion as nfa_builder.repeat_fragment
+        count = maximum if maximum is not None else max(minimum, 1)
+        if count == 0:
+            return True, 0, 0, node[3]
+
+        # only the positions of X are cloned, not the copies made so far
+        high = len(self.labels)
+        copies = [node] + [self.clone(node, high) for _ in range(count - 1)]
+        if maximum is None:
+            nullable, first, last, low = copies[-1]
+            self.chain(last, first)
+            result = (nullable or minimum == 0, first, last, low)
+            mandatory = copies[:-1]
+        else:
+            # innermost optional copy first, each one is followed by the next (optional) ones
+            result = None
+            for copy in reversed(copies[minimum:]):
+                result = (True,) + (copy if result is None else self.concat(copy, result))[1:]
+            mandatory = copies[:minimum]
+
+        for copy in reversed(mandatory):
+            result = copy if result is None else self.concat(copy, result)
+        return result
+
+def build_positions(postfix) -> Tuple[PositionTree, Node]:
+    tree = PositionTree()
+    stack: List[Node] = []
+
+    for c in postfix:
+        if isinstance(c, Repeat):
+            stack.append(tree.repeat(stack.pop(), c.min, c.max))
+        elif c == EPSILON:
+            stack.append((True, 0, 0, len(tree.labels)))
+        elif is_operand(c):
+            stack.append(tree.position(operand_label(c)))
+        elif c == '.':
+            right = stack.pop()
+            stack.append(tree.concat(stack.pop(), right))
+        elif c == '|':
+            nullable2, first2, last2, _ = stack.pop()
+            nullable1, first1, last1, low = stack.pop()
+            stack.append((nullable1 or nullable2, first1 | first2, last1 | last2, low))
+        elif c in ('*', '+'):
+            nullable, first, last, low = stack.pop()
+            tree.chain(last, first)
+            stack.append((nullable or c == '*', first, last, low))
+        elif c == '?':
+            stack.append((True,) + stack.pop()[1:])
+
+    if len(stack) != 1:
+        raise ValueError("Invalid postfix expression: too many operands")
+    return tree, stack[0]
+
+def followpos_construction(postfix, stats: Optional[Dict[str, int]] = None,
+                           budget: Optional[Budget] = None, keep_subsets: bool = True) -> DFA:
+    # DFA of the postfix expression, equivalent to subset_construction(thompson_construction(postfix)).
+    # nfa_states of the DFA states hold positions instead of NFA states (unless
+    # keep_subsets=False). stats receives the number of positions and of followpos
+    # unions, budget limits the DFA size and the time spent (StateExplosionError)
+    started = time.perf_counter()
+    tree, (nullable, first, last, _) = build_positions(postfix)
+    labels = tree.labels
+    follow = tree.follow
+
+    # the end marker '#' of the augmented regex (X)#, a state holding it is accepting
+    end = 1 << len(labels)
+    tree.chain(last, end)
+    positions = end - 1
+
+    # position label -> the DFA symbols it covers
+    expansions: Dict[Symbol, List[Symbol]] = {}
+    for symbol, covered in symbol_classes(set(labels)).items():
+        for label in covered:
+            expansions.setdefault(label, []).append(symbol)
+
+    def subset_of(mask: int):
+        return mask_to_set(mask & positions) if keep_subsets else NO_SUBSET
+
+    dfa = DFA()
+    start_mask = first | end if nullable else first
+    state_map: Dict[int, int] = {start_mask: dfa.add_state(subset_of(start_mask))}
+    if start_mask & end:
+        dfa.mark_accepting(0)
+
+    masks = [start_mask]
+    unmarked_states = deque([0])
+    unions = 0
+    transitions = 0
+
+    while unmarked_states:
+        if budget is not None:
+            check_budget(budget, started, len(dfa.states), transitions, len(unmarked_states))
+        current_state = unmarked_states.popleft()
+
+        # the next state on a symbol is the union of followpos(p) over the positions p
+        # of the current state whose label contains the symbol
+        next_masks: Dict[Symbol, int] = {}
+        members = masks[current_state] & positions
+        while members:
+            low = members & -members
+            members ^= low
+            p = low.bit_length() - 1
+            for symbol in expansions[labels[p]]:
+                next_masks[symbol] = next_masks.get(symbol, 0) | follow[p]
+            unions += 1
+
+        for symbol in sorted(next_masks, key=symbol_sort_key):
+            next_mask = next_masks[symbol]
+            next_state = state_map.get(next_mask)
+            if next_state is None:
+                next_state = dfa.add_state(subset_of(next_mask))
+                state_map[next_mask] = next_state
+                masks.append(next_mask)
+                unmarked_states.append(next_state)
+                if next_mask & end:
+                    dfa.mark_accepting(next_state)
+
+            dfa.add_transition(current_state, symbol, next_state)
+            transitions += 1
+
+    if stats is not None:
+        stats['positions'] = len(labels)
+        stats['unions'] = unions
+    return dfa
+
+if __name__ == "__main__":
+    from regex_to_postfix import regex_to_postfix
+    from nfa_builder import thompson_construction
+    from nfa_to_dfa import subset_construction, print_dfa
+
+    for expr in ["a*", "(a|b)*abb", "a(b|c)*", "[a-z]+@[a-z]+\\.com", "(ab){2,3}"]:
+        postfix = regex_to_postfix(expr)
+        dfa = followpos_construction(postfix)
+        reference = subset_construction(thompson_construction(postfix, arena=True))
+        print(f"\nRegular Expression: {expr}  (followpos: {len(dfa.states)} states, "
+              f"subset construction: {len(reference.states)} states)")
+        print_dfa(dfa)
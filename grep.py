@@ -0,0 +1,217 @@
+# line-oriented scanning of large files: every line (without its '\n') is run through
+# one compiled automaton, by default the one of .*(regex).* so a line matches when it
+# contains a match (compile_grep). The file is read in large binary chunks, each
+# chunk is turned into symbol classes with one bytes.translate, and lines are walked
+# through memoryviews, so no str or copy is made per line (only for matching lines).
+# A line is decided as soon as the DFA is dead or in an accepting state it cannot
+# leave, the scan then jumps to the next '\n'.
+# Lines are bytes, so the automaton reads UTF-8 bytes: every non-ASCII literal and
+# class of the pattern is rewritten to the UTF-8 byte sequences of its characters
+# (utf8_postfix). Bytes that are not valid UTF-8 only match the `.*` around the pattern.
+import os
+from typing import List, NamedTuple, Tuple
+
+from char_class import CharSet, EPSILON
+from compiled_dfa import CompiledDFA
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction_bitset
+from dfa_minimizer import minimize_dfa
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+class GrepResult(NamedTuple):
+    count: int                          # number of matching lines
+    matches: List[Tuple[int, bytes]]    # (byte offset, line) of matching lines, if collected
+    scanned: int                        # bytes scanned
+
+# any byte, the .* around the pattern. A match can only start on an ASCII or UTF-8
+# lead byte, so skipping any bytes never starts one inside a character
+ANY_BYTE = CharSet([(0, 0xFF)])
+# length boundaries of UTF-8 encodings: last codepoint of 1, 2, 3 and 4 bytes
+UTF8_LIMITS = (0x7F, 0x7FF, 0xFFFF, 0x10FFFF)
+SURROGATES = (0xD800, 0xDFFF)
+
+def _utf8_sequences(first: int, last: int) -> List[List[Tuple[int, int]]]:
+    # [first, last] as a list of byte range sequences: a string of bytes is the UTF-8
+    # encoding of a codepoint of the range iff it matches one of the sequences, byte i
+    # in the i-th (low, high) range. The range must not contain surrogates
+    for limit in UTF8_LIMITS[:-1]:
+        if first <= limit < last:
+            return _utf8_sequences(first, limit) + _utf8_sequences(limit + 1, last)
+    for i in range(1, 4):
+        # split until every continuation byte covers its whole 0x80-0xBF range, or
+        # first and last differ in the last byte only
+        mask = (1 << 6 * i) - 1
+        if first & ~mask != last & ~mask:
+            if first & mask:
+                return _utf8_sequences(first, first | mask) + _utf8_sequences((first | mask) + 1, last)
+            if last & mask != mask:
+                return _utf8_sequences(first, (last & ~mask) - 1) + _utf8_sequences(last & ~mask, last)
+    return [list(zip(chr(first).encode('utf-8'), chr(last).encode('utf-8')))]
+
+def _utf8_charset(charset: CharSet) -> list:
+    # postfix tokens matching the UTF-8 encoding of one character of the set
+    alternatives = []
+    ascii_ranges = [(lo, min(hi, 0x7F)) for lo, hi in charset.ranges if lo <= 0x7F]
+    if ascii_ranges:
+        alternatives.append([CharSet(ascii_ranges)])
+    for lo, hi in charset.ranges:
+        lo = max(lo, 0x80)
+        pieces = [(lo, min(hi, SURROGATES[0] - 1)), (max(lo, SURROGATES[1] + 1), hi)]
+        for first, last in pieces:
+            if first > last:
+                continue
+            for sequence in _utf8_sequences(first, last):
+                tokens = [CharSet([sequence[0]])]
+                for byte_range in sequence[1:]:
+                    tokens += [CharSet([byte_range]), '.']
+                alternatives.append(tokens)
+    if not alternatives:
+        return [CharSet([(0xFF, 0xFF)])]  # no character (surrogates only): a byte UTF-8 never has
+    tokens = alternatives[0]
+    for alternative in alternatives[1:]:
+        tokens = tokens + alternative + ['|']
+    return tokens
+
+def utf8_postfix(postfix) -> list:
+    # postfix expression over the UTF-8 bytes (as latin-1 characters) of the language
+    # of postfix: operands are replaced by the postfix form of their byte sequences,
+    # operators apply to them unchanged
+    converted = []
+    for token in postfix:
+        if isinstance(token, CharSet):
+            converted += _utf8_charset(token)
+        elif isinstance(token, str) and token != EPSILON and len(token) == 1 and ord(token) > 0x7F:
+            converted += _utf8_charset(CharSet.of(token))
+        else:
+            converted.append(token)
+    return converted
+
+def compile_grep(regex: str, whole_line: bool = False) -> CompiledDFA:
+    # automaton run over the UTF-8 bytes of every line: .*(regex).* (the line contains
+    # a match), or the regex itself with whole_line (the whole line matches, like grep -x)
+    postfix = utf8_postfix(regex_to_postfix(regex))
+    if not whole_line:
+        postfix = [ANY_BYTE, '*'] + postfix + ['.', ANY_BYTE, '*', '.']
+    dfa = subset_construction_bitset(thompson_construction(postfix, arena=True), keep_subsets=False)
+    return minimize_dfa(dfa).compile()
+
+def _accepting_sink(compiled: CompiledDFA) -> int:
+    # table offset of an accepting state whose transitions all loop back to it (the
+    # line matches whatever follows), -1 if there is none
+    num_classes = compiled.num_classes
+    for state in range(1, compiled.num_states):
+        offset = state * num_classes
+        if compiled.is_accepting(state) and all(
+                compiled.table[offset + klass] == offset for klass in range(num_classes)):
+            return offset
+    return -1
+
+def grep_file(compiled: CompiledDFA, path: str, collect: bool = True, jobs: int = 1,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> GrepResult:
+    # scan the file line by line, jobs > 1 splits it into byte ranges scanned by a
+    # process pool (ranges are aligned to line starts, results come back in file order)
+    size = os.path.getsize(path)
+    if jobs <= 1 or size < 2 * chunk_size:
+        return _grep_range(compiled, path, 0, size, collect, chunk_size)
+
+    step = -(-size // jobs)
+    bounds = [(start, min(start + step, size)) for start in range(0, size, step)]
+    data = compiled.to_bytes()
+    from concurrent.futures import ProcessPoolExecutor  # imported here, it is slow to import
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        parts = list(executor.map(_grep_range_worker, *zip(*[
+            (data, path, start, end, collect, chunk_size) for start, end in bounds])))
+
+    matches: List[Tuple[int, bytes]] = []
+    for part in parts:
+        matches.extend(part.matches)
+    return GrepResult(sum(p.count for p in parts), matches, sum(p.scanned for p in parts))
+
+def _grep_range_worker(data: bytes, path: str, start: int, end: int, collect: bool,
+                       chunk_size: int) -> GrepResult:
+    # process pool entry point, the automaton is shipped in its serialized form
+    return _grep_range(CompiledDFA.from_buffer(data), path, start, end, collect, chunk_size)
+
+def _line_start(f, position: int) -> int:
+    # offset of the first line starting at or after position
+    if position == 0:
+        return 0
+    f.seek(position - 1)
+    while True:
+        data = f.read(DEFAULT_CHUNK_SIZE)
+        if not data:
+            return f.tell()
+        newline = data.find(b'\n')
+        if newline >= 0:
+            return f.tell() - len(data) + newline + 1
+
+def _grep_range(compiled: CompiledDFA, path: str, start: int, end: int, collect: bool,
+                chunk_size: int) -> GrepResult:
+    # scan the lines starting inside [start, end)
+    count = 0
+    matches: List[Tuple[int, bytes]] = []
+    sink = _accepting_sink(compiled)
+
+    with open(path, 'rb') as f:
+        base = _line_start(f, start)  # file offset of the first byte of `block`
+        # the lines starting inside [start, end) are the bytes [first, last)
+        first = base
+        last = _line_start(f, end)
+        f.seek(base)
+        carry = b''
+        while base < end:
+            data = f.read(chunk_size)
+            if not data:
+                if carry:
+                    # last line without a trailing newline
+                    count += _scan_lines(compiled, carry + b'\n', len(carry) + 1, base, end, collect, matches, sink)
+                    base += len(carry)
+                break
+
+            block = carry + data if carry else data
+            limit = block.rfind(b'\n') + 1
+            if limit == 0:
+                carry = block
+                continue
+
+            count += _scan_lines(compiled, block, limit, base, end, collect, matches, sink)
+            carry = block[limit:]
+            base += limit
+
+    return GrepResult(count, matches, last - first)
+
+def _scan_lines(compiled: CompiledDFA, block: bytes, limit: int, base: int, end: int,
+                collect: bool, matches: List[Tuple[int, bytes]], sink: int = -1) -> int:
+    # match the complete lines of block[:limit] starting before file offset `end`,
+    # sink is the offset of an accepting state that is never left (see _accepting_sink)
+    count = 0
+    stop = min(limit, end - base)
+    table = compiled.table
+    num_classes = compiled.num_classes
+    start_offset = compiled.start_state * num_classes
+    translation = compiled.byte_translation
+    classes = memoryview(block.translate(translation)) if translation is not None else None
+
+    position = 0
+    while position < stop:
+        newline = block.find(b'\n', position, limit)
+
+        if classes is not None:
+            offset = start_offset
+            for klass in classes[position:newline]:
+                offset = table[offset + klass]
+                if offset == 0 or offset == sink:
+                    break
+            state = offset // num_classes
+        else:
+            state = compiled.run(block[position:newline])
+
+        if state and compiled.is_accepting(state):
+            count += 1
+            if collect:
+                matches.append((base + position, block[position:newline]))
+        position = newline + 1
+
+    return count
@@ -0,0 +1,55 @@
+# optional per-stage instrumentation of the compile pipeline (see process_test_json).
+# a hook is any callable hook(stage, stats) run when a stage finishes; stats holds the
+# wall time of the stage ('seconds') and the counts known at that point (states,
+# transitions, closures computed, ...). Counts are only gathered when a hook is set,
+# without one the pipeline only pays for a few perf_counter calls.
+from typing import Callable, Dict, List, Optional
+
+from nfa_builder import EPSILON
+
+StageHook = Callable[[str, Dict[str, object]], None]
+
+def nfa_stats(nfa) -> Dict[str, int]:
+    transitions = 0
+    epsilon = 0
+    for state in nfa.states:
+        for symbol, destinations in state.transitions.items():
+            transitions += len(destinations)
+            if symbol == EPSILON:
+                epsilon += len(destinations)
+    return {'nfa_states': len(nfa.states), 'nfa_transitions': transitions, 'epsilon_transitions': epsilon}
+
+def dfa_stats(dfa) -> Dict[str, int]:
+    return {
+        'dfa_states': len(dfa.states),
+        'dfa_transitions': sum(len(state.transitions) for state in dfa.states),
+        'alphabet': len(dfa.alphabet),
+    }
+
+class StageProfile:
+    # hook recording every stage, optionally forwarding it to another hook.
+    # records are plain dicts so they can travel back from worker processes
+    def __init__(self, forward: Optional[StageHook] = None):
+        self.records: List[Dict[str, object]] = []
+        self.forward = forward
+
+    def __call__(self, stage: str, stats: Dict[str, object]):
+        self.records.append(dict(stats, stage=stage))
+        if self.forward is not None:
+            self.forward(stage, stats)
+
+def format_profile(records: List[Dict[str, object]]) -> List[str]:
+    # one line per stage: name, wall time and the other counts
+    lines = []
+    for record in records:
+        counts = ", ".join(f"{key}={value}" for key, value in record.items() if key not in ('stage', 'seconds'))
+        lines.append(f"  {record['stage']:<10} {record['seconds'] * 1000:>10.3f} ms  {counts}")
+    return lines
+
+def stage_totals(results: List[dict]) -> Dict[str, float]:
+    # total seconds per stage over the profiles of several results
+    totals: Dict[str, float] = {}
+    for result in results:
+        for record in result.get('profile', ()):
+            totals[record['stage']] = totals.get(record['stage'], 0.0) + record['seconds']
+    return totals
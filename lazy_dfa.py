@@ -0,0 +1,114 @@
+# lazy (on-the-fly) DFA in the style of RE2: DFA states are subsets of NFA states,
+# computed with epsilon_closure/move only when an input first reaches them and
+# cached up to a budget. When the cache is full it is flushed and rebuilt from the
+# current state; an input that keeps flushing the cache finishes with plain NFA
+# simulation, so memory stays bounded on patterns whose full DFA would explode.
+from typing import Dict, FrozenSet, List, Set
+
+from nfa_builder import NFA
+from nfa_to_dfa import epsilon_closure, move_labels, nfa_alphabet
+from char_class import Symbol, SymbolMap, symbol_classes
+
+DEAD = -1
+
+DEFAULT_MAX_STATES = 10000
+# flushes within a single match before falling back to NFA simulation
+DEFAULT_MAX_FLUSHES = 8
+
+class LazyDFA:
+    def __init__(self, nfa: NFA, max_states: int = DEFAULT_MAX_STATES,
+                 max_flushes: int = DEFAULT_MAX_FLUSHES):
+        self.nfa = nfa
+        self.max_states = max_states
+        self.max_flushes = max_flushes
+        # disjoint input symbols -> NFA labels they follow, transitions are cached per
+        # symbol so a character class costs one cache entry, not one per character
+        self.symbols: Dict[Symbol, List[Symbol]] = symbol_classes(nfa_alphabet(nfa))
+        self.alphabet: Set[Symbol] = set(self.symbols)
+        self._symbol_of = SymbolMap({symbol: symbol for symbol in self.symbols})
+
+        # counters, useful to tune max_states
+        self.flushes = 0
+        self.fallbacks = 0
+
+        self._start_subset = frozenset(epsilon_closure(nfa, {nfa.start_state}))
+        self._reset()
+
+    def _reset(self):
+        # drop every cached state, only the start state is rebuilt
+        self._state_ids: Dict[FrozenSet[int], int] = {}
+        self._subsets: List[FrozenSet[int]] = []
+        self._transitions: List[Dict[Symbol, int]] = []
+        self._accepting: List[bool] = []
+        self._start = self._add_state(self._start_subset)
+
+    def _add_state(self, subset: FrozenSet[int]) -> int:
+        state = len(self._subsets)
+        self._state_ids[subset] = state
+        self._subsets.append(subset)
+        self._transitions.append({})
+        self._accepting.append(not self.nfa.accepting_states.isdisjoint(subset))
+        return state
+
+    def _next_subset(self, state: int, symbol: Symbol) -> FrozenSet[int]:
+        return frozenset(epsilon_closure(self.nfa, move_labels(self.nfa, self._subsets[state], self.symbols[symbol])))
+
+    def _compute(self, state: int, symbol: Symbol) -> int:
+        # compute and cache the transition of `state` on `symbol`, may flush the cache
+        subset = self._next_subset(state, symbol)
+        if not subset:
+            self._transitions[state][symbol] = DEAD
+            return DEAD
+
+        target = self._state_ids.get(subset)
+        if target is None:
+            if len(self._subsets) >= self.max_states:
+                self.flushes += 1
+                self._reset()
+                # the source state is gone, only the target survives the flush
+                target = self._state_ids.get(subset)
+                return target if target is not None else self._add_state(subset)
+            target = self._add_state(subset)
+
+        self._transitions[state][symbol] = target
+        return target
+
+    @property
+    def cached_states(self) -> int:
+        return len(self._subsets)
+
+    def match(self, text: str) -> bool:
+        state = self._start
+        flushes_at_start = self.flushes
+
+        symbol_of = self._symbol_of.lookup
+        for i, char in enumerate(text):
+            symbol = symbol_of(char)
+            if symbol is None:
+                return False  # invalid input symbol
+
+            next_state = self._transitions[state].get(symbol)
+            if next_state is None:
+                next_state = self._compute(state, symbol)
+                if self.flushes - flushes_at_start > self.max_flushes:
+                    # the cache keeps thrashing on this input, finish without caching
+                    self.fallbacks += 1
+                    return self._simulate(self._subsets[next_state], text, i + 1)
+
+            if next_state == DEAD:
+                return False
+            state = next_state
+
+        return self._accepting[state]
+
+    def _simulate(self, current: FrozenSet[int], text: str, position: int) -> bool:
+        # plain NFA simulation from `position`, no states are cached
+        states: Set[int] = set(current)
+        for char in text[position:]:
+            symbol = self._symbol_of.lookup(char)
+            if symbol is None:
+                return False
+            states = epsilon_closure(self.nfa, move_labels(self.nfa, states, self.symbols[symbol]))
+            if not states:
+                return False
+        return not self.nfa.accepting_states.isdisjoint(states)
@@ -0,0 +1,140 @@
+# load generator for the matching service (service.py / `main.py serve`).
+# opens --connections connections, each sends one request and waits for the answer
+# (closed loop) until --requests requests are answered, then reports requests/s and
+# the p50/p90/p99/max latency. Requests are match requests on the regexes and inputs of
+# the test suite file (answers are checked against "expected"), a --cold fraction of
+# them compiles a regex the service has not seen yet (a cache miss, compiled in the pool).
+# usage: python loadgen.py [--unix PATH | --host H --port P | --spawn] [options]
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+from service import DEFAULT_PORT
+
+SUITE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LFA-Assignment2_Regex_DFA_v2.json")
+
+def load_workload(path: str) -> List[Tuple[str, str, bool]]:
+    # (regex, input, expected) of every test string of the suite
+    with open(path, 'r') as f:
+        tests = json.load(f)
+    return [(test['regex'], case['input'], case['expected'])
+            for test in tests for case in test['test_strings']]
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # nearest-rank percentile of an ascending list
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class Stats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.cold_latencies: List[float] = []
+        self.errors = 0
+        self.wrong = 0
+
+async def connect(unix: Optional[str], host: str, port: int):
+    if unix is not None:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+async def client(address, workload, requests: List[int], cold: float, rng: random.Random, stats: Stats):
+    # requests is shared by the clients, each one takes request numbers until it is empty
+    reader, writer = await connect(*address)
+    try:
+        while requests:
+            number = requests.pop()
+            regex, text, expected = rng.choice(workload)
+            is_cold = rng.random() < cold
+            if is_cold:
+                # unique regex: same shape as a suite regex, different literal
+                request = {'id': number, 'op': 'compile', 'regex': f"({regex})z{number}"}
+            else:
+                request = {'id': number, 'op': 'match', 'regex': regex, 'text': text}
+
+            start = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+            line = await reader.readline()
+            elapsed = time.perf_counter() - start
+            if not line:
+                raise ConnectionError("service closed the connection")
+
+            (stats.cold_latencies if is_cold else stats.latencies).append(elapsed)
+            response = json.loads(line)
+            if not response['ok']:
+                stats.errors += 1
+            elif not is_cold and response['match'] != expected:
+                stats.wrong += 1
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def run_load(address, workload, total: int, connections: int, cold: float, seed: int) -> Tuple[Stats, float]:
+    stats = Stats()
+    requests = list(range(total, 0, -1))
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(address, workload, requests, cold, random.Random(rng.random()), stats)
+                           for _ in range(connections)))
+    return stats, time.perf_counter() - start
+
+def report(stats: Stats, elapsed: float):
+    total = len(stats.latencies) + len(stats.cold_latencies)
+    print(f"requests: {total} in {elapsed:.2f}s, {total / elapsed:.0f} req/s, "
+          f"{stats.errors} errors, {stats.wrong} wrong answers")
+    for name, latencies in (("match (cached)", stats.latencies), ("compile (cold)", stats.cold_latencies)):
+        if latencies:
+            latencies.sort()
+            print(f"{name:>15}: {len(latencies):>7} requests   latency ms: "
+                  f"p50 {percentile(latencies, 0.50) * 1000:.3f}  p90 {percentile(latencies, 0.90) * 1000:.3f}  "
+                  f"p99 {percentile(latencies, 0.99) * 1000:.3f}  max {latencies[-1] * 1000:.3f}")
+
+def spawn_service(path: str, jobs: int) -> subprocess.Popen:
+    # start `main.py serve` on the Unix socket path and wait until it listens
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    process = subprocess.Popen([sys.executable, main, "serve", "--unix", path, "--jobs", str(jobs)],
+                               stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    if not line.startswith("Listening"):
+        process.kill()
+        raise RuntimeError(f"service did not start: {line}{process.stderr.read()}")
+    return process
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for the matching service (main.py serve)")
+    parser.add_argument("--unix", metavar="PATH", help="Unix socket of the service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--spawn", action="store_true",
+                        help="start a local service on a temporary Unix socket for the run")
+    parser.add_argument("--jobs", type=int, default=0, help="compile workers of the spawned service")
+    parser.add_argument("--requests", type=int, default=20000, help="total number of requests")
+    parser.add_argument("--connections", type=int, default=16, help="concurrent connections")
+    parser.add_argument("--cold", type=float, default=0.01,
+                        help="fraction of requests compiling a new regex (default 0.01)")
+    parser.add_argument("--suite", default=SUITE_FILE, help="test suite providing the regexes and inputs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workload = load_workload(args.suite)
+    process = None
+    unix = args.unix
+    if args.spawn:
+        unix = os.path.join(tempfile.mkdtemp(), "regex2dfa.sock")
+        process = spawn_service(unix, args.jobs)
+    try:
+        stats, elapsed = asyncio.run(run_load((unix, args.host, args.port), workload, args.requests,
+                                              args.connections, args.cold, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+            os.rmdir(os.path.dirname(unix))
+    report(stats, elapsed)
+    sys.exit(1 if stats.errors or stats.wrong else 0)
@@ -1,52 +1,39 @@
+import argparse
 import json
 import os
 import sys
+import time
+from functools import partial
 from regex_to_postfix import regex_to_postfix
 from nfa_builder import thompson_construction
-from nfa_to_dfa import subset_construction, simulate_dfa
+from nfa_to_dfa import Budget, StateExplosionError, subset_construction, simulate_dfa
+from followpos_dfa import followpos_construction
+from dfa_minimizer import minimize_dfa
+from batch_match import match_batch
+from lazy_dfa import LazyDFA
+from grep import compile_grep, grep_file
+from instrumentation import StageProfile, nfa_stats, dfa_stats, format_profile, stage_totals
 
-def process_test_json(test):
-    name = test['name']
-    regex = test['regex']
-    test_strings = test['test_strings']
-    
-    # try catch to convert regex to postfix
-    try:
-        postfix_not = regex_to_postfix(regex)
-        # print(f"Postfix notation: {postfix_not}")
-    except Exception as e:
-        return {
-            'name': name,
-            'success': False,
-            'error': f"Error converting to postfix: {str(e)}"
-        }
-    
-    # build NFA using Thompson's algorithm
-    try:
-        nfa = thompson_construction(postfix_not)
-    except Exception as e:
-        return {
-            'name': name,
-            'success': False,
-            'error': f"Error building NFA: {str(e)}"
-        }
-    
-    # convert NFA-2-DFA using subset construction
-    try:
-        dfa = subset_construction(nfa)
-    except Exception as e:
-        return {
-            'name': name,
-            'success': False,
-            'error': f"Error converting to DFA: {str(e)}"
-        }
-    
-    # test if the DFA works with json test file
+# DFA construction engines: Thompson NFA + subset construction (the reference), or
+# the direct followpos construction from the syntax tree
+ENGINES = ('thompson', 'followpos')
+
+# an entry's DFA is compiled to the table form (compiled_dfa) only when its test
+# strings add up to this many characters: compile() costs about as much as walking the
+# DFA dicts over ~6000 characters, the few short strings of an entry never pay it back
+COMPILE_MIN_CHARS = 8192
+# entries with at least this many test strings are compiled and matched with
+# match_batch: it is ~3x faster than simulate_dfa on 1024 short strings (benchmarks.py
+# batch), which about pays for compiling the DFA and building its numpy tables
+BATCH_MIN_INPUTS = 1024
+
+def check_outputs(test_strings, outputs):
+    # compare the matcher outputs against the expected values of the test strings
     results = []
-    for test in test_strings:
+    for test, output in zip(test_strings, outputs):
         input_string = test['input']
         expected = test['expected']
-        result = simulate_dfa(dfa, input_string)
+        result = bool(output)
         
         if result == expected:
             status = "PASS"
@@ -62,13 +49,191 @@ def process_test_json(test):
         
         # print(f"Test '{input_string}': expected={expected}, output={result}, status={status}")
     
-    return {
+    return results
+
+def process_test_json(test, minimize=False, lazy=False, hook=None, profile=False, budget=None,
+                      engine='thompson'):
+    # hook(stage, stats) is called after every stage with its wall time and state /
+    # transition / closure counts (see instrumentation.py); profile=True also returns
+    # the stage records in result['profile']. budget (nfa_to_dfa.Budget) bounds subset
+    # construction, going over it is reported with 'error_type': 'state_explosion'.
+    # engine is one of ENGINES, lazy mode needs the NFA of the 'thompson' engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine} (expected one of {', '.join(ENGINES)})")
+    if lazy and engine != 'thompson':
+        raise ValueError("Lazy mode needs the thompson engine")
+    if lazy and budget is not None:
+        # LazyDFA bounds its state cache instead, a budget would be silently ignored
+        raise ValueError("Lazy mode does not run subset construction, a budget does not apply")
+    name = test['name']
+    regex = test['regex']
+    test_strings = test['test_strings']
+    if profile:
+        hook = StageProfile(hook)
+    
+    # try catch to convert regex to postfix
+    start = time.perf_counter()
+    try:
+        postfix_not = regex_to_postfix(regex)
+        # print(f"Postfix notation: {postfix_not}")
+    except Exception as e:
+        return {
+            'name': name,
+            'success': False,
+            'error_type': 'postfix',
+            'error': f"Error converting to postfix: {str(e)}"
+        }
+    if hook is not None:
+        hook('postfix', {'seconds': time.perf_counter() - start, 'tokens': len(postfix_not)})
+    
+    if engine == 'followpos':
+        # DFA built directly from the syntax tree (followpos), there is no NFA
+        start = time.perf_counter()
+        followpos_stats = {} if hook is not None else None
+        try:
+            dfa = followpos_construction(postfix_not, followpos_stats, budget)
+        except StateExplosionError as e:
+            return {
+                'name': name,
+                'success': False,
+                'error_type': 'state_explosion',
+                'error': f"State explosion: {str(e)}",
+                'partial_stats': e.stats
+            }
+        except Exception as e:
+            return {
+                'name': name,
+                'success': False,
+                'error_type': 'dfa',
+                'error': f"Error converting to DFA: {str(e)}"
+            }
+        if hook is not None:
+            hook('followpos', dict(dfa_stats(dfa), seconds=time.perf_counter() - start, **followpos_stats))
+    else:
+        # build NFA using Thompson's algorithm
+        start = time.perf_counter()
+        try:
+            nfa = thompson_construction(postfix_not, arena=True)
+        except Exception as e:
+            return {
+                'name': name,
+                'success': False,
+                'error_type': 'nfa',
+                'error': f"Error building NFA: {str(e)}"
+            }
+        if hook is not None:
+            hook('nfa', dict(nfa_stats(nfa), seconds=time.perf_counter() - start))
+    
+        # lazy mode: DFA states are built on demand while matching, no subset construction
+        if lazy:
+            start = time.perf_counter()
+            matcher = LazyDFA(nfa)
+            outputs = [matcher.match(test['input']) for test in test_strings]
+            if hook is not None:
+                hook('lazy_match', {'seconds': time.perf_counter() - start, 'inputs': len(test_strings),
+                                    'cached_states': matcher.cached_states, 'flushes': matcher.flushes,
+                                    'fallbacks': matcher.fallbacks})
+            result = {
+                'name': name,
+                'success': True,
+                'results': check_outputs(test_strings, outputs),
+                'dfa_states': matcher.cached_states
+            }
+            if profile:
+                result['profile'] = hook.records
+            return result
+
+        # convert NFA-2-DFA using subset construction
+        start = time.perf_counter()
+        subset_stats = {} if hook is not None else None
+        try:
+            dfa = subset_construction(nfa, subset_stats, budget)
+        except StateExplosionError as e:
+            return {
+                'name': name,
+                'success': False,
+                'error_type': 'state_explosion',
+                'error': f"State explosion: {str(e)}",
+                'partial_stats': e.stats
+            }
+        except Exception as e:
+            return {
+                'name': name,
+                'success': False,
+                'error_type': 'dfa',
+                'error': f"Error converting to DFA: {str(e)}"
+            }
+        if hook is not None:
+            hook('subset', dict(dfa_stats(dfa), seconds=time.perf_counter() - start, **subset_stats))
+    
+    dfa_states = len(dfa.states)
+    compiled = None
+
+    # optional stage: Hopcroft minimization
+    if minimize:
+        start = time.perf_counter()
+        try:
+            dfa = minimize_dfa(dfa)
+        except Exception as e:
+            return {
+                'name': name,
+                'success': False,
+                'error_type': 'minimize',
+                'error': f"Error minimizing DFA: {str(e)}"
+            }
+        if hook is not None:
+            hook('minimize', dict(dfa_stats(dfa), seconds=time.perf_counter() - start))
+
+    inputs = [test['input'] for test in test_strings]
+    if len(inputs) >= BATCH_MIN_INPUTS or sum(map(len, inputs)) >= COMPILE_MIN_CHARS:
+        # compact table form, it pays for its compile time on long inputs
+        start = time.perf_counter()
+        compiled = dfa.compile()
+        if hook is not None:
+            hook('compile', {'seconds': time.perf_counter() - start, 'states': compiled.num_states,
+                             'classes': compiled.num_classes})
+
+    # test if the DFA works with json test file
+    start = time.perf_counter()
+    if len(inputs) >= BATCH_MIN_INPUTS:
+        outputs = match_batch(compiled, inputs)
+    elif compiled is not None:
+        outputs = [compiled.match(text) for text in inputs]
+    else:
+        outputs = [simulate_dfa(dfa, text) for text in inputs]
+    if hook is not None:
+        hook('match', {'seconds': time.perf_counter() - start, 'inputs': len(test_strings)})
+
+    result = {
         'name': name,
         'success': True,
-        'results': results
+        'results': check_outputs(test_strings, outputs),
+        'dfa_states': dfa_states
     }
+    if minimize:
+        result['min_dfa_states'] = len(dfa.states)
+    if profile:
+        result['profile'] = hook.records
+    return result
+
+def process_tests(tests, minimize=False, jobs=1, lazy=False, profile=False, budget=None, engine='thompson'):
+    # run process_test_json over every entry, results stay in input order.
+    # jobs > 1 spreads the entries over a process pool, jobs=0 uses every core
+    worker = partial(process_test_json, minimize=minimize, lazy=lazy, profile=profile, budget=budget,
+                     engine=engine)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(tests) <= 1:
+        return [worker(test) for test in tests]
+
+    # a few chunks per worker keeps the pool busy without per-entry IPC overhead
+    chunksize = max(1, len(tests) // (jobs * 4))
+    from concurrent.futures import ProcessPoolExecutor  # imported here, it is slow to import
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(worker, tests, chunksize=chunksize))
 
-def process_test_file(file_path):
+def process_test_file(file_path, minimize=False, jobs=1, lazy=False, profile=False, budget=None,
+                      engine='thompson'):
     try:
         with open(file_path, 'r') as f:
             tests = json.load(f)
@@ -78,22 +243,154 @@ def process_test_file(file_path):
 
     print(f"Tests loaded: {len(tests)} tests")
 
-    results = []
-    for test in tests:
-        result = process_test_json(test)
-        results.append(result)
+    results = process_tests(tests, minimize=minimize, jobs=jobs, lazy=lazy, profile=profile, budget=budget,
+                            engine=engine)
 
     success_count = sum(1 for r in results if r['success'] == True)
     print("Tests passed:", success_count, "/", len(tests))
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        # test file path provided as command line argument
-        test_file = sys.argv[1]
+    for r in results:
+        if r.get('error_type') == 'state_explosion':
+            print(f"{r['name']}: {r['error']}")
+
+    if minimize and not lazy:
+        compiled = [r for r in results if r['success']]
+        before = sum(r['dfa_states'] for r in compiled)
+        after = sum(r['min_dfa_states'] for r in compiled)
+        print(f"DFA states: {before} before minimization, {after} after")
+
+    if profile:
+        for r in results:
+            if 'profile' in r:
+                print(f"Profile of {r['name']}:")
+                print("\n".join(format_profile(r['profile'])))
+        totals = stage_totals(results)
+        print("Total per stage: " + ", ".join(f"{stage} {seconds * 1000:.3f} ms" for stage, seconds in totals.items()))
+
+    return results
+
+def run_grep(argv):
+    # grep subcommand: compile the regex once and match it against every line of a file
+    parser = argparse.ArgumentParser(prog="main.py grep",
+                                     description="Print the lines of a file that contain a match of a regex")
+    parser.add_argument("regex")
+    parser.add_argument("file")
+    parser.add_argument("-x", "--line-regexp", action="store_true",
+                        help="only print lines that match the regex as a whole")
+    parser.add_argument("-c", "--count", action="store_true", help="only print the number of matching lines")
+    parser.add_argument("-b", "--byte-offset", action="store_true", help="prefix each line with its byte offset")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="split the file across worker processes (0 = one per CPU core)")
+    parser.add_argument("--stats", action="store_true", help="print scan throughput (MB/s) to stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        compiled = compile_grep(args.regex, whole_line=args.line_regexp)
+    except Exception as e:
+        print(f"Error compiling regex: {str(e)}", file=sys.stderr)
+        return 2
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    start = time.perf_counter()
+    try:
+        result = grep_file(compiled, args.file, collect=not args.count, jobs=jobs)
+    except OSError as e:
+        # exit status 1 means no matching line, errors are 2 like grep
+        print(f"grep: {args.file}: {e.strerror or e}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+
+    if args.count:
+        print(result.count)
     else:
-        # default test file path, test file provided by teacher
-        test_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                                 "regex2dfa/LFA-Assignment2_Regex_DFA_v2.json")
-    
-    # print(f"test file: {test_file}")
-    process_test_file(test_file)
\ No newline at end of file
+        out = sys.stdout.buffer
+        for offset, line in result.matches:
+            if args.byte_offset:
+                out.write(f"{offset}:".encode())
+            out.write(line + b'\n')
+        out.flush()
+
+    if args.stats:
+        megabytes = result.scanned / 1e6
+        print(f"Scanned {megabytes:.1f} MB in {elapsed:.3f}s ({megabytes / max(elapsed, 1e-9):.1f} MB/s), "
+              f"{result.count} matching lines", file=sys.stderr)
+
+    return 0 if result.count else 1
+
+def run_serve(argv):
+    # serve subcommand: asyncio compile/match service on a local socket (see service.py)
+    import asyncio  # imported here, like the pool, only the service needs it
+    from service import DEFAULT_MAX_STATES, DEFAULT_PORT, DEFAULT_TIMEOUT, MatchService, serve
+    from pattern_cache import PatternCache
+
+    parser = argparse.ArgumentParser(prog="main.py serve",
+                                     description="Answer line-delimited JSON compile/match requests on a socket")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=None, help="TCP port (default: 7878)")
+    parser.add_argument("--jobs", type=int, default=0,
+                        help="compile worker processes (default 0 = one per CPU core, -1 = compile in a thread)")
+    parser.add_argument("--cache-entries", type=int, default=None, help="compiled patterns kept (LRU)")
+    parser.add_argument("--max-states", type=int, default=DEFAULT_MAX_STATES,
+                        help="refuse patterns whose DFA needs more states, state explosion guard "
+                             f"(default {DEFAULT_MAX_STATES}, 0 = no limit)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="refuse patterns whose subset construction takes longer "
+                             f"(seconds, default {DEFAULT_TIMEOUT:g}, 0 = no limit)")
+    args = parser.parse_args(argv)
+
+    budget = Budget(max_states=args.max_states or None, timeout=args.timeout or None)
+    cache = PatternCache() if args.cache_entries is None else PatternCache(max_entries=args.cache_entries)
+    jobs = args.jobs if args.jobs != 0 else (os.cpu_count() or 1)
+    service = MatchService(jobs=max(jobs, 0), cache=cache, budget=budget)
+
+    def ready(address):
+        print(f"Listening on {address} ({jobs if jobs > 0 else 'no'} compile workers)", file=sys.stderr, flush=True)
+
+    port = args.port if args.port is not None else DEFAULT_PORT
+    asyncio.run(serve(service, unix=args.unix, host=args.host, port=port, ready=ready))
+    return 0
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "grep":
+        sys.exit(run_grep(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        sys.exit(run_serve(sys.argv[2:]))
+
+    # default test file path, test file provided by teacher
+    default_test_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     "regex2dfa/LFA-Assignment2_Regex_DFA_v2.json")
+
+    parser = argparse.ArgumentParser(description="Convert regexes to DFAs and run JSON test suites")
+    parser.add_argument("test_file", nargs="?", default=default_test_file,
+                        help="JSON test file (defaults to the assignment test file)")
+    parser.add_argument("--minimize", action="store_true",
+                        help="minimize every DFA (Hopcroft) before matching")
+    parser.add_argument("--engine", choices=ENGINES, default='thompson',
+                        help="DFA construction: Thompson NFA + subset construction (default) or direct followpos construction")
+    parser.add_argument("--lazy", action="store_true",
+                        help="build DFA states lazily while matching instead of running subset construction")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of worker processes (0 = one per CPU core)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print wall time and state/transition/closure counts of every pipeline stage")
+    parser.add_argument("--max-states", type=int, default=None,
+                        help="fail an entry whose DFA needs more states (state explosion guard)")
+    parser.add_argument("--max-transitions", type=int, default=None,
+                        help="fail an entry whose DFA needs more transitions")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="fail an entry whose subset construction takes longer (seconds)")
+    args = parser.parse_args()
+    if args.lazy and args.engine != 'thompson':
+        parser.error("--lazy needs the thompson engine")
+    if args.lazy and (args.max_states is not None or args.max_transitions is not None or args.timeout is not None):
+        parser.error("--lazy does not run subset construction, --max-states, --max-transitions "
+                     "and --timeout do not apply")
+
+    budget = None
+    if args.max_states is not None or args.max_transitions is not None or args.timeout is not None:
+        budget = Budget(max_states=args.max_states, max_transitions=args.max_transitions, timeout=args.timeout)
+
+    # print(f"test file: {args.test_file}")
+    process_test_file(args.test_file, minimize=args.minimize, jobs=args.jobs, lazy=args.lazy,
+                      profile=args.profile, budget=budget, engine=args.engine)
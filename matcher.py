@@ -0,0 +1,49 @@
+# picks how to match a pattern: direct NFA simulation when only a handful of
+# inputs will be matched (no determinization cost), a compiled DFA otherwise
+from typing import Optional
+
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import NFA, thompson_construction
+from nfa_to_dfa import input_labels, simulate_nfa, subset_construction_bitset
+
+ENGINES = ('auto', 'nfa', 'dfa')
+
+# building and compiling the DFA costs roughly as much as simulating the NFA over
+# this many characters per NFA state (measured on the benchmark patterns)
+DFA_BREAK_EVEN_CHARS_PER_STATE = 4
+DEFAULT_AVERAGE_LENGTH = 32
+
+class NFAMatcher:
+    # matcher running simulate_nfa, same interface as CompiledDFA.match
+    def __init__(self, nfa: NFA):
+        self.nfa = nfa
+        self.labels = input_labels(nfa)
+
+    def match(self, text: str) -> bool:
+        return simulate_nfa(self.nfa, text, self.labels)
+
+def choose_engine(nfa: NFA, expected_inputs: Optional[int],
+                  average_length: int = DEFAULT_AVERAGE_LENGTH) -> str:
+    # 'nfa' if simulating every expected input is cheaper than building the DFA,
+    # 'dfa' otherwise (also when the input volume is unknown)
+    if expected_inputs is None:
+        return 'dfa'
+    simulated_chars = expected_inputs * average_length
+    if simulated_chars < DFA_BREAK_EVEN_CHARS_PER_STATE * len(nfa.states):
+        return 'nfa'
+    return 'dfa'
+
+def build_matcher(regex: str, engine: str = 'auto', expected_inputs: Optional[int] = None,
+                  average_length: int = DEFAULT_AVERAGE_LENGTH):
+    # matcher object with a match(text) method, using the given engine
+    # ('auto' picks one from the NFA size and the expected input volume)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine} (expected one of {', '.join(ENGINES)})")
+
+    nfa = thompson_construction(regex_to_postfix(regex), arena=True)
+    if engine == 'auto':
+        engine = choose_engine(nfa, expected_inputs, average_length)
+
+    if engine == 'nfa':
+        return NFAMatcher(nfa)
+    return subset_construction_bitset(nfa, keep_subsets=False).compile()
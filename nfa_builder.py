@@ -1,23 +1,32 @@
 #postifx regex to an NFA using Thompson's algorithm.
-from typing import Dict, Set, List, Tuple
+from typing import Dict, Set, List, Optional, Tuple
 
-EPSILON = 'ε'
+from char_class import EPSILON, CharSet, Symbol, symbol_label
+from regex_to_postfix import Repeat
+from compact_nfa import CompactNFA
 
 class State:
+    __slots__ = ('transitions', 'is_accepting')
+
     def __init__(self):
-        self.transitions: Dict[str, Set[int]] = {}
+        # symbol is a character, a CharSet (character class) or EPSILON
+        self.transitions: Dict[Symbol, Set[int]] = {}
         self.is_accepting = False
     
-    def add_transition(self, symbol: str, state: int):
+    def add_transition(self, symbol: Symbol, state: int):
         if symbol not in self.transitions:
             self.transitions[symbol] = set()
         self.transitions[symbol].add(state)
 
 class NFA:
+    __slots__ = ('states', 'start_state', 'accepting_states', 'accept_ids')
+
     def __init__(self):
         self.states: List[State] = []
         self.start_state = 0
         self.accepting_states: Set[int] = set()
+        # accepting state -> pattern id, only used by NFAs combining several patterns
+        self.accept_ids: Dict[int, int] = {}
     
     def add_state(self) -> int:
         self.states.append(State())
@@ -27,19 +36,47 @@ class NFA:
         self.states[state].is_accepting = True
         self.accepting_states.add(state)
     
-    def add_transition(self, from_state: int, symbol: str, to_state: int):
+    def add_transition(self, from_state: int, symbol: Symbol, to_state: int):
         self.states[from_state].add_transition(symbol, to_state)
 
-def thompson_construction(postfix: str) -> NFA:
+    def clone_states(self, low: int, high: int) -> int:
+        # append a copy of states [low, high) whose transitions stay inside the copy,
+        # returns the index shift from an original state to its copy
+        shift = len(self.states) - low
+        for state in self.states[low:high]:
+            copy = State()
+            copy.transitions = {symbol: {dest + shift for dest in destinations}
+                                for symbol, destinations in state.transitions.items()}
+            self.states.append(copy)
+        return shift
+
+    def tag_accepting(self, state: int, pattern_id: int):
+        # mark state as accepting for the pattern with the given id
+        self.mark_accepting(state)
+        self.accept_ids[state] = pattern_id
+
+    def compact(self) -> CompactNFA:
+        # read-only CSR copy for holding on to the NFA with less memory
+        return CompactNFA.from_nfa(self)
+
+def operand_label(token) -> Symbol:
+    # transition label of a postfix operand token (character, 'ε' or CharSet)
+    return symbol_label(token) if isinstance(token, CharSet) else token
+
+def thompson_construction(postfix, arena: bool = False) -> NFA:
     # build the NFA from the postfix expression using Thompson's algorithm
+    # arena=True allocates every state in a single NFA (linear time), see thompson_arena
+    if arena:
+        return thompson_arena(postfix)
+
     stack = []
     
     for c in postfix:
-        if c.isalnum():
+        if isinstance(c, CharSet) or (isinstance(c, str) and c.isalnum()):
             nfa = NFA()
             start = nfa.add_state()
             end = nfa.add_state()
-            nfa.add_transition(start, c, end)
+            nfa.add_transition(start, operand_label(c), end)
             nfa.mark_accepting(end)
             stack.append((nfa, start, end))
         
@@ -219,12 +256,173 @@ def thompson_construction(postfix: str) -> NFA:
             
             # push the new NFA onto the stack
             stack.append((nfa, new_start, new_end))
+
+        elif isinstance(c, Repeat):  # counted repetition {m,n}
+            nfa1, start1, end1 = stack.pop()
+
+            # repeat a copy of nfa1 (states and transitions only)
+            repeated = NFA()
+            for _ in range(len(nfa1.states)):
+                repeated.add_state()
+            for i, state in enumerate(nfa1.states):
+                for symbol, destinations in state.transitions.items():
+                    for dest in destinations:
+                        repeated.add_transition(i, symbol, dest)
+            start2, end2 = repeat_fragment(repeated, start1, end1, 0, c.min, c.max)
+
+            nfa = NFA()
+
+            # the start state has to be state 0, it leads into the repetition
+            new_start = nfa.add_state()
+            offset = len(nfa.states)
+            for _ in range(len(repeated.states)):
+                nfa.add_state()
+            for i, state in enumerate(repeated.states):
+                for symbol, destinations in state.transitions.items():
+                    for dest in destinations:
+                        nfa.add_transition(offset + i, symbol, offset + dest)
+            nfa.add_transition(new_start, EPSILON, offset + start2)
+
+            # mark the end state of the repetition as accepting
+            nfa.mark_accepting(offset + end2)
+
+            # push the new NFA onto the stack
+            stack.append((nfa, new_start, offset + end2))
     
     if len(stack) != 1:
         raise ValueError("Invalid postfix expression: too many operands")
     
     return stack[0][0]
 
+def thompson_arena(postfix) -> NFA:
+    # Thompson's construction where all states live in one shared NFA (the arena).
+    # fragments on the stack are just (start, end) indices, operators only add
+    # new states/epsilon edges instead of copying their operands, so the build is
+    # linear in the length of the postfix expression
+    nfa = NFA()
+    start, end = build_fragment(nfa, postfix)
+
+    # the start state is no longer state 0, so record it explicitly
+    nfa.start_state = start
+    nfa.mark_accepting(end)
+
+    return nfa
+
+def build_fragment(nfa: NFA, postfix) -> Tuple[int, int]:
+    # add the states of the postfix expression to an existing NFA (arena),
+    # returns the (start, end) states of the new fragment.
+    # stack entries are (start, end, low): every fragment owns the contiguous states
+    # [low, len(nfa.states)) when it is on top of the stack, so {m,n} can clone it
+    stack: List[Tuple[int, int, int]] = []
+
+    for c in postfix:
+        if isinstance(c, CharSet) or (isinstance(c, str) and c.isalnum()):
+            # a character class is a single transition labelled with its CharSet
+            start = nfa.add_state()
+            end = nfa.add_state()
+            nfa.add_transition(start, operand_label(c), end)
+            stack.append((start, end, start))
+
+        elif c == '.':  # concatenation
+            start2, end2, _ = stack.pop()
+            start1, end1, low1 = stack.pop()
+
+            # link the end of the first fragment to the start of the second
+            nfa.add_transition(end1, EPSILON, start2)
+            stack.append((start1, end2, low1))
+
+        elif c == '|':  # alternation
+            start2, end2, _ = stack.pop()
+            start1, end1, low1 = stack.pop()
+
+            new_start = nfa.add_state()
+            new_end = nfa.add_state()
+            nfa.add_transition(new_start, EPSILON, start1)
+            nfa.add_transition(new_start, EPSILON, start2)
+            nfa.add_transition(end1, EPSILON, new_end)
+            nfa.add_transition(end2, EPSILON, new_end)
+            stack.append((new_start, new_end, low1))
+
+        elif c == '*':  # kleene star ( > 0 )
+            start1, end1, low1 = stack.pop()
+
+            new_start = nfa.add_state()
+            new_end = nfa.add_state()
+            nfa.add_transition(new_start, EPSILON, new_end)
+            nfa.add_transition(new_start, EPSILON, start1)
+            nfa.add_transition(end1, EPSILON, new_end)
+            nfa.add_transition(end1, EPSILON, start1)
+            stack.append((new_start, new_end, low1))
+
+        elif c == '+':  # plus operator (one or more)
+            start1, end1, low1 = stack.pop()
+
+            new_start = nfa.add_state()
+            new_end = nfa.add_state()
+            nfa.add_transition(new_start, EPSILON, start1)
+            nfa.add_transition(end1, EPSILON, new_end)
+            nfa.add_transition(end1, EPSILON, start1)
+            stack.append((new_start, new_end, low1))
+
+        elif c == '?':  # Optional operator (zero or one)
+            start1, end1, low1 = stack.pop()
+
+            new_start = nfa.add_state()
+            new_end = nfa.add_state()
+            nfa.add_transition(new_start, EPSILON, start1)
+            nfa.add_transition(end1, EPSILON, new_end)
+            nfa.add_transition(new_start, EPSILON, new_end)
+            stack.append((new_start, new_end, low1))
+
+        elif isinstance(c, Repeat):  # counted repetition {m,n}
+            start1, end1, low1 = stack.pop()
+
+            new_start, new_end = repeat_fragment(nfa, start1, end1, low1, c.min, c.max)
+            stack.append((new_start, new_end, low1))
+
+    if len(stack) != 1:
+        raise ValueError("Invalid postfix expression: too many operands")
+
+    return stack[0][:2]
+
+def repeat_fragment(nfa: NFA, start: int, end: int, low: int,
+                    minimum: int, maximum: Optional[int]) -> Tuple[int, int]:
+    # X{m,n} for the fragment X = (start, end) owning the states [low, len(nfa.states)).
+    # X is cloned (no re-parsing, one pass over its states per copy) into m mandatory
+    # copies followed by n - m nested optional ones, X(X(X)?)?: the start of every
+    # optional copy can skip to the end. For X{m,} the last copy loops (X{0,} is X*).
+    # Thompson fragments have no edge into their start or out of their end, so the
+    # copies can be chained and skipped with plain epsilon edges
+    high = len(nfa.states)
+    count = maximum if maximum is not None else max(minimum, 1)
+    new_start = nfa.add_state()
+    new_end = nfa.add_state()
+    if count == 0:
+        # X{0} only matches the empty string
+        nfa.add_transition(new_start, EPSILON, new_end)
+        return new_start, new_end
+
+    copies = [(start, end)]
+    while len(copies) < count:
+        shift = nfa.clone_states(low, high)
+        copies.append((start + shift, end + shift))
+
+    nfa.add_transition(new_start, EPSILON, copies[0][0])
+    for (_, end1), (start2, _) in zip(copies, copies[1:]):
+        nfa.add_transition(end1, EPSILON, start2)
+    last_start, last_end = copies[-1]
+    nfa.add_transition(last_end, EPSILON, new_end)
+
+    if maximum is None:
+        nfa.add_transition(last_end, EPSILON, last_start)
+        if minimum == 0:
+            nfa.add_transition(new_start, EPSILON, new_end)
+    else:
+        for copy_start, _ in copies[minimum:]:
+            nfa.add_transition(copy_start, EPSILON, new_end)
+
+    return new_start, new_end
+
 def print_nfa(nfa: NFA):
     print("NFA States:", len(nfa.states))
     print("Start State:", nfa.start_state)
@@ -237,7 +435,7 @@ def print_nfa(nfa: NFA):
                 print(f"  {i} --({symbol})--> {dest}")
 
 if __name__ == "__main__":
-    from regex_to_postfix import regex_to_postfix
+    from regex_to_postfix import regex_to_postfix, format_postfix
     
     test_expressions = [
         "a*",
@@ -248,6 +446,6 @@ if __name__ == "__main__":
     for expr in test_expressions:
         print(f"\nRegular Expression: {expr}")
         postfix = regex_to_postfix(expr)
-        print(f"Postfix: {postfix}")
+        print(f"Postfix: {format_postfix(postfix)}")
         nfa = thompson_construction(postfix)
         print_nfa(nfa)
\ No newline at end of file
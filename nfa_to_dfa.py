@@ -1,19 +1,33 @@
-from typing import Dict, Set, List, Tuple, FrozenSet
+import time
+from collections import deque
+from typing import Dict, Set, List, NamedTuple, Optional, Tuple, FrozenSet
 from nfa_builder import NFA, EPSILON
-from graphviz import Digraph
+from char_class import Symbol, SymbolMap, symbol_classes, symbol_sort_key
+from compiled_dfa import CompiledDFA
+
+# nfa_states of DFA states whose subset was discarded (see DFA.discard_subsets)
+NO_SUBSET: FrozenSet[int] = frozenset()
 
 class DFAState:
+    __slots__ = ('nfa_states', 'transitions', 'is_accepting', 'match_ids')
+
     def __init__(self, nfa_states: Set[int]):
         self.nfa_states = nfa_states
-        self.transitions: Dict[str, int] = {}
+        self.transitions: Dict[Symbol, int] = {}
         self.is_accepting = False
+        # ids of the patterns accepted here, for DFAs built from a tagged NFA (see RegexSet)
+        self.match_ids: FrozenSet[int] = frozenset()
 
 class DFA:
+    __slots__ = ('states', 'start_state', 'accepting_states', 'alphabet', '_symbols')
+
     def __init__(self):
         self.states: List[DFAState] = []
         self.start_state = 0
         self.accepting_states: Set[int] = set()
-        self.alphabet: Set[str] = set()
+        # disjoint symbols: characters and CharSet atoms of the NFA's character classes
+        self.alphabet: Set[Symbol] = set()
+        self._symbols: Optional[SymbolMap] = None
     
     def add_state(self, nfa_states: Set[int]) -> int:
         self.states.append(DFAState(nfa_states))
@@ -23,9 +37,64 @@ class DFA:
         self.states[state].is_accepting = True
         self.accepting_states.add(state)
     
-    def add_transition(self, from_state: int, symbol: str, to_state: int):
+    def add_transition(self, from_state: int, symbol: Symbol, to_state: int):
         self.states[from_state].transitions[symbol] = to_state
-        self.alphabet.add(symbol)
+        if symbol not in self.alphabet:
+            self.alphabet.add(symbol)
+            self._symbols = None
+
+    def symbol_map(self) -> SymbolMap:
+        # character -> alphabet symbol containing it, built once and kept until the
+        # alphabet changes (simulate_dfa uses it on every call)
+        if self._symbols is None:
+            self._symbols = SymbolMap({symbol: symbol for symbol in self.alphabet})
+        return self._symbols
+
+    def discard_subsets(self):
+        # drop the NFA state set of every DFA state, it is only needed while building
+        # (the DFA keeps working, minimize_dfa then merges empty sets)
+        for state in self.states:
+            state.nfa_states = NO_SUBSET
+
+    def compile(self) -> CompiledDFA:
+        # flat transition table form of this DFA, see compiled_dfa.py
+        return CompiledDFA.from_dfa(self)
+
+class Budget(NamedTuple):
+    # limits for subset construction, None means unlimited. timeout is wall time in
+    # seconds, cancel is any object with is_set() (e.g. threading.Event) polled like it.
+    # limits are checked once per processed DFA state, so they can be overshot by the
+    # transitions of that one state
+    max_states: Optional[int] = None
+    max_transitions: Optional[int] = None
+    timeout: Optional[float] = None
+    cancel: Optional[object] = None
+
+class StateExplosionError(ValueError):
+    # subset construction went over a Budget limit ('max_states', 'max_transitions',
+    # 'timeout' or 'cancelled'), stats holds the partial progress
+    def __init__(self, limit: str, stats: Dict[str, object]):
+        self.limit = limit
+        self.stats = stats
+        super().__init__(f"{limit} exceeded after {stats['dfa_states']} DFA states, "
+                         f"{stats['dfa_transitions']} transitions, {stats['pending_states']} "
+                         f"states left to process, {stats['seconds']:.3f}s")
+
+def check_budget(budget: Budget, started: float, states: int, transitions: int, pending: int):
+    # raise StateExplosionError if any limit of the budget is exceeded
+    elapsed = time.perf_counter() - started
+    if budget.max_states is not None and states > budget.max_states:
+        limit = 'max_states'
+    elif budget.max_transitions is not None and transitions > budget.max_transitions:
+        limit = 'max_transitions'
+    elif budget.timeout is not None and elapsed > budget.timeout:
+        limit = 'timeout'
+    elif budget.cancel is not None and budget.cancel.is_set():
+        limit = 'cancelled'
+    else:
+        return
+    raise StateExplosionError(limit, {'dfa_states': states, 'dfa_transitions': transitions,
+                                      'pending_states': pending, 'seconds': elapsed})
 
 def epsilon_closure(nfa: NFA, states: Set[int]) -> Set[int]:
     #epsilon closure of a set of states in the NFA
@@ -47,7 +116,7 @@ def epsilon_closure(nfa: NFA, states: Set[int]) -> Set[int]:
     
     return closure
 
-def move(nfa: NFA, states: Set[int], symbol: str) -> Set[int]:
+def move(nfa: NFA, states: Set[int], symbol: Symbol) -> Set[int]:
     # compute the set of states reachable from the given states on the given symbol
     
     result = set()
@@ -58,15 +127,40 @@ def move(nfa: NFA, states: Set[int], symbol: str) -> Set[int]:
     
     return result
 
-def subset_construction(nfa: NFA) -> DFA:
-    dfa = DFA()
-    
-    # find all symbols in the NFA (excluding epsilon)
+def move_labels(nfa: NFA, states: Set[int], labels: List[Symbol]) -> Set[int]:
+    # states reachable on any of the given NFA labels (the labels a DFA symbol follows)
+    if len(labels) == 1:
+        return move(nfa, states, labels[0])
+    result = set()
+    for label in labels:
+        result |= move(nfa, states, label)
+    return result
+
+def nfa_alphabet(nfa: NFA) -> Set[Symbol]:
+    # labels of all non-epsilon transitions of the NFA
     alphabet = set()
     for state in nfa.states:
         for symbol in state.transitions:
             if symbol != EPSILON:
                 alphabet.add(symbol)
+    return alphabet
+
+def matched_pattern_ids(nfa: NFA, states: Set[int]) -> FrozenSet[int]:
+    # ids of the patterns whose tagged accepting state is in `states`
+    return frozenset(nfa.accept_ids[state] for state in states if state in nfa.accept_ids)
+
+def subset_construction(nfa: NFA, stats: Optional[Dict[str, int]] = None,
+                        budget: Optional[Budget] = None, keep_subsets: bool = True) -> DFA:
+    # stats, if given, receives the number of epsilon closures computed and the
+    # total number of NFA states they contained. budget limits the DFA size and the
+    # time spent (StateExplosionError). keep_subsets=False discards the NFA state set
+    # of every DFA state once the DFA is built
+    started = time.perf_counter()
+    dfa = DFA()
+    
+    # find all symbols in the NFA (excluding epsilon), character classes are
+    # split into disjoint symbols, each one follows a list of NFA labels
+    classes = symbol_classes(nfa_alphabet(nfa))
     
     # compute epsilon closure of start state
     start_closure = epsilon_closure(nfa, {nfa.start_state})
@@ -79,23 +173,32 @@ def subset_construction(nfa: NFA) -> DFA:
         if state in nfa.accepting_states:
             dfa.mark_accepting(0)
             break
+    if nfa.accept_ids:
+        dfa.states[0].match_ids = matched_pattern_ids(nfa, start_closure)
     
     # queue of DFA states to process
-    unmarked_states = [0]
+    unmarked_states = deque([0])
     
     # map NFA state sets to DFA states
     state_map = {frozenset(start_closure): 0}
+    closures = 1
+    closure_states = len(start_closure)
+    transitions = 0
     
     while unmarked_states:
-        current_state = unmarked_states.pop(0)
+        if budget is not None:
+            check_budget(budget, started, len(dfa.states), transitions, len(unmarked_states))
+        current_state = unmarked_states.popleft()
         current_nfa_states = dfa.states[current_state].nfa_states
         
-        for symbol in alphabet:
+        for symbol, labels in classes.items():
             # find all states reachable on symbol from current states
-            next_states = move(nfa, current_nfa_states, symbol)
+            next_states = move_labels(nfa, current_nfa_states, labels)
             
             # apply epsilon closure
             next_closure = epsilon_closure(nfa, next_states)
+            closures += 1
+            closure_states += len(next_closure)
             
             if not next_closure:  # if no states reachable, continue
                 continue
@@ -114,10 +217,131 @@ def subset_construction(nfa: NFA) -> DFA:
                     if nfa_state in nfa.accepting_states:
                         dfa.mark_accepting(new_state)
                         break
+                if nfa.accept_ids:
+                    dfa.states[new_state].match_ids = matched_pattern_ids(nfa, next_closure)
             
             # add transition in DFA
             dfa.add_transition(current_state, symbol, state_map[next_frozenset])
+            transitions += 1
     
+    if not keep_subsets:
+        dfa.discard_subsets()
+    if stats is not None:
+        stats['closures'] = closures
+        stats['closure_states'] = closure_states
+    return dfa
+
+def epsilon_closure_masks(nfa: NFA, states) -> Dict[int, int]:
+    # epsilon closure of each of the given NFA states as an integer bitmask
+    masks = {}
+    for state in states:
+        mask = 0
+        for member in epsilon_closure(nfa, {state}):
+            mask |= 1 << member
+        masks[state] = mask
+    return masks
+
+def mask_to_set(mask: int) -> Set[int]:
+    # NFA state numbers of the bits set in mask
+    return {i for i, bit in enumerate(reversed(bin(mask)[2:])) if bit == '1'}
+
+def subset_construction_bitset(nfa: NFA, stats: Optional[Dict[str, int]] = None,
+                               budget: Optional[Budget] = None, keep_subsets: bool = True) -> DFA:
+    # subset construction on integer bitmasks instead of sets:
+    #  - epsilon closures are computed once per NFA state and stored as bitmasks
+    #  - move tables hold, per NFA state and symbol, the closure of the targets
+    #  - DFA states are deduplicated by their (integer) mask
+    #  - the worklist is a deque
+    # builds the same DFA as subset_construction, up to state numbering
+    # stats, if given, receives the number of closures and of move table unions,
+    # budget limits the DFA size and the time spent (StateExplosionError),
+    # keep_subsets=False never builds the NFA state sets of the DFA states
+    started = time.perf_counter()
+    dfa = DFA()
+
+    # only the start state and targets of symbol transitions ever need a closure
+    closure_sources = {nfa.start_state}
+    for state in nfa.states:
+        for symbol, destinations in state.transitions.items():
+            if symbol != EPSILON:
+                closure_sources.update(destinations)
+    closures = epsilon_closure_masks(nfa, closure_sources)
+
+    # NFA label -> the DFA symbols it covers (itself, unless there are character classes)
+    expansions: Dict[Symbol, List[Symbol]] = {}
+    for symbol, labels in symbol_classes(nfa_alphabet(nfa)).items():
+        for label in labels:
+            expansions.setdefault(label, []).append(symbol)
+
+    # per NFA state: symbol -> bitmask of the epsilon-closed targets
+    moves: Dict[int, Dict[Symbol, int]] = {}
+    has_moves = 0
+    for i, state in enumerate(nfa.states):
+        table = {}
+        for label, destinations in state.transitions.items():
+            if label == EPSILON:
+                continue
+            mask = 0
+            for dest in destinations:
+                mask |= closures[dest]
+            for symbol in expansions[label]:
+                table[symbol] = table.get(symbol, 0) | mask
+        if table:
+            moves[i] = table
+            has_moves |= 1 << i
+
+    accepting_mask = 0
+    for state in nfa.accepting_states:
+        accepting_mask |= 1 << state
+
+    subset_of = mask_to_set if keep_subsets else (lambda mask: NO_SUBSET)
+
+    start_mask = closures[nfa.start_state]
+    state_map: Dict[int, int] = {start_mask: dfa.add_state(subset_of(start_mask))}
+    if start_mask & accepting_mask:
+        dfa.mark_accepting(0)
+        if nfa.accept_ids:
+            dfa.states[0].match_ids = matched_pattern_ids(nfa, mask_to_set(start_mask))
+
+    masks = [start_mask]
+    unmarked_states = deque([0])
+    unions = 0
+    transitions = 0
+
+    while unmarked_states:
+        if budget is not None:
+            check_budget(budget, started, len(dfa.states), transitions, len(unmarked_states))
+        current_state = unmarked_states.popleft()
+
+        # union the move tables of every member state that has symbol transitions
+        next_masks: Dict[Symbol, int] = {}
+        members = masks[current_state] & has_moves
+        while members:
+            low = members & -members
+            members ^= low
+            for symbol, target in moves[low.bit_length() - 1].items():
+                next_masks[symbol] = next_masks.get(symbol, 0) | target
+            unions += 1
+
+        for symbol in sorted(next_masks, key=symbol_sort_key):
+            next_mask = next_masks[symbol]
+            next_state = state_map.get(next_mask)
+            if next_state is None:
+                next_state = dfa.add_state(subset_of(next_mask))
+                state_map[next_mask] = next_state
+                masks.append(next_mask)
+                unmarked_states.append(next_state)
+                if next_mask & accepting_mask:
+                    dfa.mark_accepting(next_state)
+                    if nfa.accept_ids:
+                        dfa.states[next_state].match_ids = matched_pattern_ids(nfa, mask_to_set(next_mask))
+
+            dfa.add_transition(current_state, symbol, next_state)
+            transitions += 1
+
+    if stats is not None:
+        stats['closures'] = len(closures)
+        stats['unions'] = unions
     return dfa
 
 def print_dfa(dfa: DFA):
@@ -135,23 +359,46 @@ def print_dfa(dfa: DFA):
 
 def simulate_dfa(dfa: DFA, input_string: str) -> bool:
     # simulate a DFA on an input string
-    
+    symbols = dfa.symbol_map()
+    # without character classes every symbol is a single character, a plain dict lookup
+    lookup = symbols.lookup if symbols.has_ranges else symbols.chars.get
+    states = dfa.states
     current_state = dfa.start_state
-    
+
     for char in input_string:
-        if char not in dfa.alphabet:
-            return False  # invalid input symbol
-        
-        if char in dfa.states[current_state].transitions:
-            current_state = dfa.states[current_state].transitions[char]
-        else:
-            return False  # no valid transition
-    
+        # None for a character outside the alphabet or without a transition
+        current_state = states[current_state].transitions.get(lookup(char))
+        if current_state is None:
+            return False
+
     # check if final state is accepting
     return current_state in dfa.accepting_states
 
+def input_labels(nfa: NFA) -> SymbolMap:
+    # character -> list of the NFA labels (characters, CharSets) it matches
+    return SymbolMap(symbol_classes(nfa_alphabet(nfa)))
+
+def simulate_nfa(nfa: NFA, input_string: str, labels: Optional[SymbolMap] = None) -> bool:
+    # simulate the NFA directly, tracking the set of active states (no determinization)
+    # labels (see input_labels) can be passed in to reuse them across calls
+
+    current_states = epsilon_closure(nfa, {nfa.start_state})
+    if labels is None:
+        labels = input_labels(nfa)
+
+    for char in input_string:
+        char_labels = labels.lookup(char)
+        if char_labels is None:
+            return False  # invalid input symbol
+        current_states = epsilon_closure(nfa, move_labels(nfa, current_states, char_labels))
+        if not current_states:
+            return False  # no valid transition
+
+    # accepting if any active state is accepting
+    return not nfa.accepting_states.isdisjoint(current_states)
+
 if __name__ == "__main__":
-    from regex_to_postfix import regex_to_postfix
+    from regex_to_postfix import regex_to_postfix, format_postfix
     from nfa_builder import thompson_construction
     
     test_expressions = [
@@ -163,7 +410,7 @@ if __name__ == "__main__":
     for expr in test_expressions:
         print(f"\nRegular Expression: {expr}")
         postfix = regex_to_postfix(expr)
-        print(f"Postfix: {postfix}")
+        print(f"Postfix: {format_postfix(postfix)}")
         
         print("\nNFA:")
         nfa = thompson_construction(postfix)
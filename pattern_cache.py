@@ -0,0 +1,120 @@
+# in-process cache of compiled automata keyed by regex, with LRU eviction.
+# compile(regex) runs the whole pipeline (postfix -> NFA -> DFA -> minimized DFA ->
+# compiled table) once per pattern and serves later calls from the cache.
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import Budget, subset_construction_bitset
+from dfa_minimizer import minimize_dfa
+from compiled_dfa import CompiledDFA
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_STATES = 1_000_000
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    states: int       # total states of the cached automata
+    max_entries: int
+    max_states: int
+
+def compile_regex(regex: str, minimize: bool = True, budget: Optional[Budget] = None) -> CompiledDFA:
+    # uncached compile: regex -> postfix -> NFA -> DFA (-> minimized) -> compiled table
+    # budget bounds subset construction (raises StateExplosionError), for untrusted patterns
+    postfix = regex_to_postfix(regex)
+    nfa = thompson_construction(postfix, arena=True)
+    dfa = subset_construction_bitset(nfa, budget=budget, keep_subsets=False)
+    if minimize:
+        dfa = minimize_dfa(dfa)
+    return dfa.compile()
+
+class PatternCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_states: int = DEFAULT_MAX_STATES,
+                 budget: Optional[Budget] = None):
+        self.max_entries = max_entries
+        self.max_states = max_states
+        # limits applied to every compile on a miss, see nfa_to_dfa.Budget
+        self.budget = budget
+        self._entries: 'OrderedDict[str, CompiledDFA]' = OrderedDict()
+        self._states = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, regex: str) -> CompiledDFA:
+        # compiled automaton for regex, compiling (outside the lock) on a miss
+        compiled = self.lookup(regex)
+        if compiled is None:
+            compiled = compile_regex(regex, budget=self.budget)
+            self.store(regex, compiled)
+        return compiled
+
+    def lookup(self, regex: str) -> Optional[CompiledDFA]:
+        # cached automaton for regex or None (counted as a miss), for callers that
+        # compile elsewhere (e.g. in a worker process) and store() the result
+        with self._lock:
+            compiled = self._entries.get(regex)
+            if compiled is not None:
+                self._entries.move_to_end(regex)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+            return None
+
+    def store(self, regex: str, compiled: CompiledDFA):
+        with self._lock:
+            if regex not in self._entries and compiled.num_states <= self.max_states:
+                self._entries[regex] = compiled
+                self._states += compiled.num_states
+                self._evict()
+
+    def configure(self, max_entries: Optional[int] = None, max_states: Optional[int] = None,
+                  budget: Optional[Budget] = None):
+        # change the limits, evicting least recently used entries if needed
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_states is not None:
+                self.max_states = max_states
+            if budget is not None:
+                self.budget = budget
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._states = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self._entries),
+                             self._states, self.max_entries, self.max_states)
+
+    def _evict(self):
+        # caller holds the lock
+        while self._entries and (len(self._entries) > self.max_entries or self._states > self.max_states):
+            _, compiled = self._entries.popitem(last=False)
+            self._states -= compiled.num_states
+            self.evictions += 1
+
+_default_cache = PatternCache()
+
+def compile(regex: str) -> CompiledDFA:
+    # compiled automaton for regex, served from the process-wide LRU cache
+    return _default_cache.get(regex)
+
+def configure(max_entries: Optional[int] = None, max_states: Optional[int] = None,
+              budget: Optional[Budget] = None):
+    _default_cache.configure(max_entries=max_entries, max_states=max_states, budget=budget)
+
+def cache_info() -> CacheInfo:
+    return _default_cache.info()
+
+def purge():
+    _default_cache.clear()
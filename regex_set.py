@@ -0,0 +1,42 @@
+# match one input against many patterns in a single pass. All patterns are built
+# into one Thompson NFA joined by alternation from a shared start state, the end
+# state of every pattern is tagged with its id, and subset construction collects
+# the ids of the tagged states into each DFA state.
+from typing import List, Sequence, Tuple
+
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import NFA, EPSILON, build_fragment
+from nfa_to_dfa import subset_construction_bitset
+from dfa_minimizer import minimize_dfa
+
+class RegexSet:
+    def __init__(self, patterns: Sequence[str], minimize: bool = True):
+        self.patterns = list(patterns)
+        nfa = NFA()
+        start = nfa.add_state()
+        for pattern_id, pattern in enumerate(self.patterns):
+            try:
+                fragment_start, fragment_end = build_fragment(nfa, regex_to_postfix(pattern))
+            except Exception as e:
+                raise ValueError(f"Invalid pattern #{pattern_id} {pattern!r}: {str(e)}") from e
+            nfa.add_transition(start, EPSILON, fragment_start)
+            nfa.tag_accepting(fragment_end, pattern_id)
+        nfa.start_state = start
+
+        dfa = subset_construction_bitset(nfa, keep_subsets=False)
+        if minimize:
+            dfa = minimize_dfa(dfa)
+        self.dfa_states = len(dfa.states)
+        self.compiled = dfa.compile()
+
+        # pattern ids per compiled state (compiled state i + 1 is DFA state i, 0 is dead)
+        self._match_ids: List[Tuple[int, ...]] = [()]
+        for state in dfa.states:
+            self._match_ids.append(tuple(sorted(state.match_ids)))
+
+    def matches(self, text) -> List[int]:
+        # ids (indexes into patterns) of every pattern matching the whole text, in order
+        return list(self._match_ids[self.compiled.run(text)])
+
+    def match_any(self, text) -> bool:
+        return self.compiled.match(text)
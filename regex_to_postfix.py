@@ -1,84 +1,264 @@
 # regex infix notation to postfix notation using the Shunting Yard algorithm (polish notation)
-def add_explicit_concatenation(regex):
-    # add explicit concatenation operator '.' to a regex
-    output = []
-    for i in range(len(regex)):
-        output.append(regex[i])
-        if i < len(regex) - 1:
-            left_concat = regex[i] not in '(|' and regex[i] != '\\'
-
-            # if the previous character is a backslash, disable concatenation            
-            if i > 0 and regex[i-1] == '\\':
-                left_concat = False
-            
-            right_concat = regex[i+1] not in ')|?+*'
-
-            # if the NEXT character is a backslash (and not the last char), treat it as something that CAN be concatenated like a normal character.
-            if regex[i+1] == '\\' and i+1 < len(regex) - 1:
-                right_concat = True
-            
-            if left_concat and right_concat:
-                output.append('.')
-    
-    return ''.join(output)
-
-def regex_to_postfix(regex):
-    # add explicit concatenation operators
-    regex = add_explicit_concatenation(regex)
-    
-    # precedence of operators
-    precedence = {
-        '|': 1,
-        '.': 2,
-        '?': 3,
-        '*': 3,
-        '+': 3
-    }
-    stack = []
-    output = []
+# the postfix form is a list of tokens: operators are the str characters '.|*+?',
+# operands are alphanumeric characters, 'ε', or a CharSet for character classes
+# ([a-z], [^...], '.', \d, \w, \s) and for literal characters that are not alphanumeric.
+# Counted repetition {m}, {m,}, {m,n} is a postfix Repeat operator token
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
 
+from char_class import EPSILON, CharSet, CLASS_ESCAPES, ANY
+
+# largest count accepted in {m,n}, every count is a copy of the repeated fragment
+MAX_REPEAT = 1000
+# largest number of operand positions added by expanding the counts of the pattern,
+# nested counts multiply ((a{1000}){1000} is a million copies of a), so a short
+# pattern could otherwise need gigabytes of NFA before any Budget is checked.
+# Positions written out in the pattern itself are not limited
+MAX_EXPANDED_SIZE = 100_000
+
+class Repeat(NamedTuple):
+    # {min,max} operator, max is None for {min,}
+    min: int
+    max: Optional[int]
+
+    def __str__(self) -> str:
+        if self.max is None:
+            return f"{{{self.min},}}"
+        if self.max == self.min:
+            return f"{{{self.min}}}"
+        return f"{{{self.min},{self.max}}}"
+
+Token = Union[str, CharSet, Repeat]
+
+# \n, \t, ... inside and outside of classes, any other escaped character is itself
+ESCAPE_CHARS = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v'}
+
+class RegexSyntaxError(ValueError):
+    # invalid pattern, position is the 0-based index in the pattern where it was found
+    def __init__(self, message: str, position: int):
+        super().__init__(f"{message} at position {position}")
+        self.message = message
+        self.position = position
+
+def is_operand(token: Token) -> bool:
+    return isinstance(token, CharSet) or (isinstance(token, str) and (token.isalnum() or token == EPSILON))
+
+# precedence of the binary operators: . (concatenation) > | (union). The postfix
+# operators * + ? {m,n} bind tighter than both and go straight to the output
+PRECEDENCE = {'|': 1, '.': 2}
+
+# tokens of tokenize() that are not operands, besides Repeat
+SYNTAX = frozenset('()|*+?')
+
+@lru_cache(maxsize=4096)
+def literal(char: str) -> Token:
+    # operand token for one literal character (a literal 'ε' is not an epsilon move),
+    # cached: the same punctuation repeats throughout long patterns
+    if char.isalnum() and char != EPSILON:
+        return char
+    return CharSet.of(char)
+
+def parse_escape(regex: str, i: int) -> Tuple[Union[str, CharSet], int]:
+    # escape sequence starting after the backslash at regex[i - 1],
+    # returns a character or a CharSet (\d, \w, ...) and the index after it
+    if i >= len(regex):
+        raise RegexSyntaxError("Trailing backslash", i - 1)
+    c = regex[i]
+    if c in CLASS_ESCAPES:
+        return CLASS_ESCAPES[c], i + 1
+    return ESCAPE_CHARS.get(c, c), i + 1
+
+def parse_class(regex: str, i: int) -> Tuple[CharSet, int]:
+    # bracket expression starting after the '[' at regex[i - 1], returns the set and
+    # the index after the closing ']'. A ']' first in the class and a '-' first or
+    # last in it are literal characters
+    start = i - 1
+    negate = i < len(regex) and regex[i] == '^'
+    if negate:
+        i += 1
+
+    ranges: List[Tuple[int, int]] = []
+    first = True
+    while True:
+        if i >= len(regex):
+            raise RegexSyntaxError("Unterminated character class", start)
+        c = regex[i]
+        if c == ']' and not first:
+            i += 1
+            break
+        first = False
+
+        item_start = i
+        if c == '\\':
+            item, i = parse_escape(regex, i + 1)
+            if isinstance(item, CharSet):
+                ranges.extend(item.ranges)
+                continue
+            lo = item
+        else:
+            lo = c
+            i += 1
+
+        if i + 1 < len(regex) and regex[i] == '-' and regex[i + 1] != ']':
+            if regex[i + 1] == '\\':
+                hi, i = parse_escape(regex, i + 2)
+                if isinstance(hi, CharSet):
+                    raise RegexSyntaxError("Invalid range end in character class", item_start)
+            else:
+                hi = regex[i + 1]
+                i += 2
+            if ord(hi) < ord(lo):
+                raise RegexSyntaxError(f"Invalid range {lo}-{hi} in character class", item_start)
+            ranges.append((ord(lo), ord(hi)))
+        else:
+            ranges.append((ord(lo), ord(lo)))
+
+    charset = CharSet(ranges)
+    if negate:
+        charset = charset.negate()
+    if not charset.ranges:
+        raise RegexSyntaxError("Empty character class", start)
+    return charset, i
+
+def parse_repeat(regex: str, i: int) -> Optional[Tuple[Repeat, int]]:
+    # {m}, {m,} or {m,n} starting at the '{' at regex[i], returns the operator and the
+    # index after the '}', None if this is not a repetition ('{' is then a literal)
+    close = regex.find('}', i)
+    if close < 0:
+        return None
+    body = regex[i + 1:close]
+    low, comma, high = body.partition(',')
+    if not (low.isascii() and low.isdigit()) or (high and not (high.isascii() and high.isdigit())):
+        return None
+
+    minimum = int(low)
+    maximum = int(high) if high else (None if comma else minimum)
+    if maximum is not None and maximum < minimum:
+        raise RegexSyntaxError(f"Invalid repetition {{{body}}}: min is larger than max", i)
+    if max(minimum, maximum or 0) > MAX_REPEAT:
+        raise RegexSyntaxError(f"Repetition {{{body}}} exceeds the limit of {MAX_REPEAT}", i)
+    return Repeat(minimum, maximum), close + 1
+
+def tokenize(regex: str) -> Iterator[Tuple[Token, int]]:
+    # single pass over the pattern, yields (token, position of its first character):
+    # operands, the operators '|*+?' and Repeat, and the parentheses '(' ')'
     i = 0
-    while i < len(regex):
+    n = len(regex)
+    while i < n:
         c = regex[i]
-        # handle escape characters
-        if c == '\\' and i + 1 < len(regex):
-            output.append(c + regex[i+1])
-            i += 2
-            continue
-        
-        if c.isalnum() or c in ['ε']:
-            # append to output
-            output.append(c)
-        elif c == '(':
-            # push onto stack
-            stack.append(c)
-        elif c == ')':
-            # pop operators until matching left parenthesis
-            while stack and stack[-1] != '(':
-                output.append(stack.pop())
-            if stack and stack[-1] == '(':
-                stack.pop()
+        if c.isalnum() or c in SYNTAX:
+            yield c, i
+            i += 1
+        elif c == '\\':
+            item, end = parse_escape(regex, i + 1)
+            yield (item if isinstance(item, CharSet) else literal(item)), i
+            i = end
+        elif c == '[':
+            charset, end = parse_class(regex, i + 1)
+            yield charset, i
+            i = end
+        elif c == '.':
+            yield ANY, i
+            i += 1
+        else:
+            repeat = parse_repeat(regex, i) if c == '{' else None
+            if repeat is not None:
+                yield repeat[0], i
+                i = repeat[1]
             else:
-                raise ValueError("Mismatched parentheses")
+                yield literal(c), i
+                i += 1
+
+def regex_to_postfix(regex: str) -> List[Token]:
+    # tokenize and convert to postfix in the same pass (shunting yard), inserting the
+    # concatenation operator '.' between adjacent operands. The postfix token list is
+    # what the NFA builders and followpos_construction consume.
+    # Raises RegexSyntaxError with the position of the problem
+    output: List[Token] = []
+    operators: List[Tuple[str, int]] = []   # pending '(', '|', '.' and their positions
+    expect_operand = True                   # at the start and after '(' or '|'
+    # expanded size (operand positions) of the enclosing group so far and of its last
+    # atom (operand or group, the one a repeat applies to), saved at '(' for the outer group,
+    # and the positions added by the counts so far
+    size = 0
+    atom = 0
+    outer_sizes: List[Tuple[int, int]] = []
+    added = 0
+
+    def push_operator(op: str, position: int):
+        # pop operators with higher or equal precedence, then push
+        while operators and operators[-1][0] != '(' and PRECEDENCE[operators[-1][0]] >= PRECEDENCE[op]:
+            output.append(operators.pop()[0])
+        operators.append((op, position))
+
+    for token, position in tokenize(regex):
+        if token not in SYNTAX and not isinstance(token, Repeat):
+            # operand
+            if not expect_operand:
+                push_operator('.', position)
+            output.append(token)
+            expect_operand = False
+            size += 1
+            atom = 1
+        elif token == '(':
+            if not expect_operand:
+                push_operator('.', position)
+            operators.append((token, position))
+            expect_operand = True
+            outer_sizes.append((size, atom))
+            size = atom = 0
+        elif token == ')':
+            if expect_operand:
+                if operators and operators[-1][0] == '(':
+                    raise RegexSyntaxError("Empty group", operators[-1][1])
+                raise RegexSyntaxError("Missing operand before ')'", position)
+            # pop operators until the matching left parenthesis
+            while operators and operators[-1][0] != '(':
+                output.append(operators.pop()[0])
+            if not operators:
+                raise RegexSyntaxError("Unmatched ')'", position)
+            operators.pop()
+            atom = size
+            size, _ = outer_sizes.pop()
+            size += atom
+        elif token == '|':
+            if expect_operand:
+                raise RegexSyntaxError("Missing operand before '|'", position)
+            push_operator(token, position)
+            expect_operand = True
         else:
-            # pop operators with higher or equal precedence, then push
-            # * (Kleene star) > . (concatenation) > | (union)
-            while stack and \
-                stack[-1] != '(' and \
-                stack[-1] in precedence and \
-                precedence[stack[-1]] >= precedence.get(c, 0):
-                    output.append(stack.pop())
-            stack.append(c)
-        
-        i += 1
-    
+            # postfix operator: * + ? or {m,n}, applies to the operand just output
+            if expect_operand:
+                raise RegexSyntaxError(f"Nothing to repeat with '{token}'", position)
+            output.append(token)
+            if isinstance(token, Repeat):
+                copies = token.max if token.max is not None else max(token.min, 1)
+                size += atom * (copies - 1)
+                added += atom * (copies - 1)
+                atom *= copies
+                if added > MAX_EXPANDED_SIZE:
+                    raise RegexSyntaxError(f"Counts expand the pattern by more than {MAX_EXPANDED_SIZE} "
+                                           f"positions with {token}", position)
+
+    if expect_operand:
+        if not regex:
+            raise RegexSyntaxError("Empty pattern", 0)
+        if operators and operators[-1][0] == '(':
+            raise RegexSyntaxError("Unclosed '('", operators[-1][1])
+        raise RegexSyntaxError("Unexpected end of pattern", len(regex))
+
     # pop any remaining operators
-    while stack:
-        if stack[-1] == '(':
-            raise ValueError("Mismatched parentheses")
-        output.append(stack.pop())
-    
-    return ''.join(output)
+    while operators:
+        op, position = operators.pop()
+        if op == '(':
+            raise RegexSyntaxError("Unclosed '('", position)
+        output.append(op)
+
+    return output
+
+def format_postfix(postfix: List[Token]) -> str:
+    # printable form of a postfix token list
+    return ''.join(str(token) for token in postfix)
 
 if __name__ == "__main__":
     test_expressions = [
@@ -90,10 +270,19 @@ if __name__ == "__main__":
         "a(b|c)*",
         "(a|b)(c|d)",
         "a?bc*",
-        "(a+b)*c"
+        "(a+b)*c",
+        "[a-z]+@[a-z]+\\.com",
+        "\\d\\d?:\\d\\d",
+        "[^0-9]*",
+        "\\d{1,3}(,\\d{3})*",
+        "(ab){2,}"
     ]
-    
+
     for expr in test_expressions:
-        with_concat = add_explicit_concatenation(expr)
-        postfix = regex_to_postfix(expr)
-        print(f"{expr:15} -> {with_concat:15} -> {postfix}")
\ No newline at end of file
+        print(f"{expr:20} -> {format_postfix(regex_to_postfix(expr))}")
+
+    for expr in ["a|*b", "(ab", "ab)", "()", "a|", "[a-", "a{3,1}", "", "((a{1000}){1000}){1000}"]:
+        try:
+            regex_to_postfix(expr)
+        except RegexSyntaxError as e:
+            print(f"{expr!r:20} -> {e}")
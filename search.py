@@ -0,0 +1,145 @@
+# unanchored search: find where a pattern occurs inside a larger text.
+# Three automata are built from the Thompson NFA:
+#  - forward unanchored DFA (implicit .* prefix), answers "is there any match" and
+#    stops at the first position where a match ends
+#  - reverse unanchored DFA, read from the end of the text towards the start, it is
+#    accepting exactly at the positions where a match starts (one linear pass)
+#  - forward anchored DFA, extends a match from its start to its longest end
+# matches are leftmost-longest and non-overlapping.
+from typing import Iterator, List, Optional, Tuple
+
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import NFA, EPSILON, thompson_construction
+from nfa_to_dfa import nfa_alphabet, subset_construction_bitset
+from compiled_dfa import CompiledDFA, OTHER_CLASS
+
+def reverse_nfa(nfa: NFA) -> NFA:
+    # NFA for the reversed language: every edge flipped, start and accepting states swapped
+    reverse = NFA()
+    for _ in nfa.states:
+        reverse.add_state()
+    for i, state in enumerate(nfa.states):
+        for symbol, destinations in state.transitions.items():
+            for dest in destinations:
+                reverse.add_transition(dest, symbol, i)
+
+    if len(nfa.accepting_states) == 1:
+        reverse.start_state = next(iter(nfa.accepting_states))
+    else:
+        reverse.start_state = reverse.add_state()
+        for state in nfa.accepting_states:
+            reverse.add_transition(reverse.start_state, EPSILON, state)
+    reverse.mark_accepting(nfa.start_state)
+    return reverse
+
+def unanchored_nfa(nfa: NFA) -> NFA:
+    # adds a new start state looping on every symbol (the implicit .* prefix), in place
+    alphabet = nfa_alphabet(nfa)
+    loop = nfa.add_state()
+    for symbol in alphabet:
+        nfa.add_transition(loop, symbol, loop)
+    nfa.add_transition(loop, EPSILON, nfa.start_state)
+    nfa.start_state = loop
+    return nfa
+
+def compile_unanchored(nfa: NFA) -> CompiledDFA:
+    # compiled DFA of an unanchored NFA, symbols outside the alphabet restart the
+    # search (they kill every thread except the .* loop) instead of going dead
+    compiled = subset_construction_bitset(nfa, keep_subsets=False).compile()
+    k = compiled.num_classes
+    start_offset = compiled.start_state * k
+    for state in range(1, compiled.num_states):
+        compiled.table[state * k + OTHER_CLASS] = start_offset
+    return compiled
+
+def _accepting_rows(compiled: CompiledDFA) -> bytearray:
+    # accept flag indexed by row offset, so the scan loops avoid a division per symbol
+    k = compiled.num_classes
+    rows = bytearray(compiled.num_states * k)
+    for state in range(compiled.num_states):
+        if compiled.is_accepting(state):
+            rows[state * k] = 1
+    return rows
+
+class Searcher:
+    def __init__(self, regex: str):
+        postfix = regex_to_postfix(regex)
+        self.regex = regex
+        self.anchored = subset_construction_bitset(thompson_construction(postfix, arena=True), keep_subsets=False).compile()
+        self.forward = compile_unanchored(unanchored_nfa(thompson_construction(postfix, arena=True)))
+        self.reverse = compile_unanchored(unanchored_nfa(reverse_nfa(thompson_construction(postfix, arena=True))))
+
+        self._anchored_accepting = _accepting_rows(self.anchored)
+        self._forward_accepting = _accepting_rows(self.forward)
+        self._reverse_accepting = _accepting_rows(self.reverse)
+
+    def first_end(self, text, pos: int = 0) -> int:
+        # smallest position where a match (starting at or after pos) ends, -1 if none
+        table = self.forward.table
+        accepting = self._forward_accepting
+        offset = self.forward.start_state * self.forward.num_classes
+        if accepting[offset]:
+            return pos
+        classes = self.forward.classes_of(text)
+        for i in range(pos, len(classes)):
+            offset = table[offset + classes[i]]
+            if accepting[offset]:
+                return i + 1
+        return -1
+
+    def contains(self, text) -> bool:
+        return self.first_end(text) >= 0
+
+    def match_starts(self, text, pos: int = 0) -> bytearray:
+        # flags[i] is 1 if some match starts at position i (i >= pos), one backward pass
+        classes = self.reverse.classes_of(text)
+        n = len(classes)
+        table = self.reverse.table
+        accepting = self._reverse_accepting
+        offset = self.reverse.start_state * self.reverse.num_classes
+
+        flags = bytearray(n + 1)
+        flags[n] = accepting[offset]
+        for i in range(n - 1, pos - 1, -1):
+            offset = table[offset + classes[i]]
+            flags[i] = accepting[offset]
+        return flags
+
+    def _longest_end(self, classes, start: int) -> int:
+        # end of the longest match starting at `start` (known to exist)
+        table = self.anchored.table
+        accepting = self._anchored_accepting
+        offset = self.anchored.start_state * self.anchored.num_classes
+        end = start if accepting[offset] else -1
+        for i in range(start, len(classes)):
+            offset = table[offset + classes[i]]
+            if offset == 0:
+                break
+            if accepting[offset]:
+                end = i + 1
+        return end
+
+    def search(self, text, pos: int = 0) -> Optional[Tuple[int, int]]:
+        # (start, end) of the leftmost-longest match at or after pos, None if there is none
+        if self.first_end(text, pos) < 0:
+            return None
+        flags = self.match_starts(text, pos)
+        start = flags.find(1, pos)
+        return start, self._longest_end(self.anchored.classes_of(text), start)
+
+    def finditer(self, text, pos: int = 0) -> Iterator[Tuple[int, int]]:
+        # every non-overlapping leftmost-longest match, as (start, end) offsets
+        flags = self.match_starts(text, pos)
+        classes = self.anchored.classes_of(text)
+        n = len(classes)
+        while pos <= n:
+            start = flags.find(1, pos)
+            if start < 0:
+                return
+            end = self._longest_end(classes, start)
+            yield start, end
+            # an empty match still has to move the search forward
+            pos = end if end > start else start + 1
+
+    def findall(self, text, pos: int = 0) -> List[Tuple[int, int]]:
+        return list(self.finditer(text, pos))
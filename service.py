@@ -0,0 +1,298 @@
+# asyncio matching service speaking line-delimited JSON over a Unix or TCP socket
+# (started with `main.py serve`). Every request is one JSON object on one line and is
+# answered by one line; requests of a connection are answered in order, clients open
+# several connections for concurrency. An "id" field is echoed back.
+#   {"op": "compile", "regex": R}                  -> {"ok": true, "states": N, "cached": B}
+#   {"op": "match", "regex": R, "text": T}         -> {"ok": true, "match": B}
+#   {"op": "match", "regex": R, "texts": [T, ...]} -> {"ok": true, "matches": [B, ...]}
+#   {"op": "stats"}                                -> {"ok": true, "cache": {...}, ...}
+# failures answer {"ok": false, "error": message}, plus "position" for syntax errors
+# and "limit" when the compile went over the budget.
+# Compiled automata live in one PatternCache shared by all connections. Misses are
+# compiled in a process pool, so subset construction never runs on the event loop:
+# the worker sends back CompiledDFA.to_bytes() and the service loads the table with
+# from_buffer. Concurrent misses on the same regex wait for a single compile, and a
+# regex whose compile failed (syntax error or over the budget) gets the same error
+# again without recompiling.
+import asyncio
+import json
+import os
+import signal
+import sys
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from compiled_dfa import CompiledDFA
+from nfa_to_dfa import Budget, StateExplosionError
+from pattern_cache import PatternCache, compile_regex
+from regex_to_postfix import RegexSyntaxError
+
+DEFAULT_PORT = 7878
+# longest request line accepted (regex and texts included), longer ones close the connection
+DEFAULT_MAX_LINE = 1 << 20
+# budget of `main.py serve` unless overridden: a client must not be able to keep a
+# worker busy with a pattern whose DFA explodes, like (a|b)*a(a|b){20}
+DEFAULT_MAX_STATES = 10_000
+DEFAULT_TIMEOUT = 5.0
+# failed compiles remembered (LRU), a pattern that blows its budget is refused from
+# then on instead of running the whole budgeted compile again
+MAX_FAILURES = 1024
+
+class RequestError(ValueError):
+    # a request that gets an {"ok": false} answer, fields are added to the answer
+    def __init__(self, error: str, **fields):
+        super().__init__(error)
+        self.fields = dict(error=error, **fields)
+
+def error_fields(e: ValueError) -> dict:
+    # answer fields of a compile error (RegexSyntaxError, StateExplosionError, ...)
+    fields = {'error': str(e)}
+    for name in ('position', 'limit'):
+        if hasattr(e, name):
+            fields[name] = getattr(e, name)
+    return fields
+
+def _compile_worker(regex: str, minimize: bool,
+                    budget: Optional[Budget]) -> Tuple[Optional[bytes], Optional[dict], bool]:
+    # (serialized automaton, None, False) or (None, error fields, permanent). Errors are
+    # returned rather than raised, RegexSyntaxError and StateExplosionError do not survive
+    # pickling. Only those two are permanent: the same regex fails the same way again
+    try:
+        return compile_regex(regex, minimize=minimize, budget=budget).to_bytes(), None, False
+    except (RegexSyntaxError, StateExplosionError) as e:
+        return None, error_fields(e), True
+    except MemoryError:
+        return None, {'error': "out of memory while compiling"}, False
+    except ValueError as e:
+        return None, error_fields(e), False
+
+class MatchService:
+    def __init__(self, jobs: int = 1, cache: Optional[PatternCache] = None, budget: Optional[Budget] = None,
+                 minimize: bool = True, max_line: int = DEFAULT_MAX_LINE):
+        # jobs worker processes compile the misses, 0 compiles them in a thread of the
+        # event loop (no pool, the GIL is then shared with the connections)
+        self.jobs = jobs
+        self.cache = cache if cache is not None else PatternCache()
+        # limits of every compile, the cancel field is not used (it does not cross processes)
+        self.budget = budget
+        self.minimize = minimize
+        self.max_line = max_line
+        self._executor = None
+        self._pool_lock: Optional[asyncio.Lock] = None  # created on the event loop
+        self._compiling: Dict[str, asyncio.Future] = {}
+        self._failures: 'OrderedDict[str, dict]' = OrderedDict()
+        self._handlers: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.compiles = 0
+
+    def start(self):
+        if self.jobs > 0 and self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor  # imported here, it is slow to import
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs)
+
+    def close(self):
+        if self._executor is not None:
+            if sys.version_info >= (3, 9):
+                self._executor.shutdown(cancel_futures=True)
+            else:  # no cancel_futures, queued compiles still run
+                self._executor.shutdown()
+            self._executor = None
+
+    async def compiled(self, regex: str) -> Tuple[CompiledDFA, bool]:
+        # (automaton, True if it came from the cache)
+        compiled = self.cache.lookup(regex)
+        if compiled is not None:
+            return compiled, True
+        failure = self._failures.get(regex)
+        if failure is not None:
+            self._failures.move_to_end(regex)
+            raise RequestError(**failure)
+        pending = self._compiling.get(regex)
+        if pending is None:
+            pending = asyncio.ensure_future(self._compile(regex))
+            self._compiling[regex] = pending
+            pending.add_done_callback(lambda _: self._compiling.pop(regex, None))
+        # shielded, a client hanging up does not cancel the compile others wait for
+        return await asyncio.shield(pending), False
+
+    async def _compile(self, regex: str) -> CompiledDFA:
+        from concurrent.futures.process import BrokenProcessPool
+        loop = asyncio.get_running_loop()
+        self.compiles += 1
+        executor = self._executor
+        try:
+            data, error, permanent = await loop.run_in_executor(executor, _compile_worker,
+                                                                regex, self.minimize, self.budget)
+        except BrokenProcessPool:
+            # a worker died (killed, out of memory). Not remembered: every compile queued
+            # in the pool fails with it, not only the culprit
+            await self._replace_pool(executor)
+            raise RequestError("compile worker died")
+        except Exception as e:
+            data, error, permanent = None, {'error': f"compile failed: {e!r}"}, False
+        if error is not None:
+            if permanent:
+                self._failures[regex] = error
+                if len(self._failures) > MAX_FAILURES:
+                    self._failures.popitem(last=False)
+            raise RequestError(**error)
+        compiled = CompiledDFA.from_buffer(data)
+        self.cache.store(regex, compiled)
+        return compiled
+
+    async def _replace_pool(self, broken):
+        # start a new pool for the next compiles, once: the compiles that were queued in
+        # the broken pool all fail at the same time and must not start one pool each
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._executor is not broken:
+                return  # already replaced, or the service was closed
+            self._executor = None
+            self.start()
+            await asyncio.get_running_loop().run_in_executor(None, broken.shutdown)
+
+    async def handle(self, request: dict) -> dict:
+        op = request.get('op')
+        if op == 'stats':
+            return {'ok': True, 'cache': self.cache.info()._asdict(), 'connections': self.connections,
+                    'requests': self.requests, 'errors': self.errors, 'compiles': self.compiles,
+                    'compiling': len(self._compiling), 'failures': len(self._failures)}
+        if op not in ('compile', 'match'):
+            raise RequestError(f"unknown op: {op!r}")
+
+        regex = request.get('regex')
+        if not isinstance(regex, str):
+            raise RequestError("'regex' must be a string")
+        if op == 'match':
+            # checked before compiling, a bad request does not cost a compile
+            text, texts = request.get('text'), request.get('texts')
+            if texts is None and not isinstance(text, str):
+                raise RequestError("'text' must be a string (or 'texts' a list of strings)")
+            if texts is not None and not (isinstance(texts, list) and all(isinstance(t, str) for t in texts)):
+                raise RequestError("'texts' must be a list of strings")
+
+        compiled, cached = await self.compiled(regex)
+        if op == 'compile':
+            return {'ok': True, 'states': compiled.num_states, 'cached': cached}
+        if texts is not None:
+            return {'ok': True, 'matches': [compiled.match(t) for t in texts]}
+        return {'ok': True, 'match': compiled.match(text)}
+
+    async def disconnect(self, timeout: float = 5.0):
+        # close every connection, the handlers see the end of input and finish the
+        # request they are answering (for up to timeout seconds)
+        for writer in self._handlers.values():
+            writer.close()
+        if self._handlers:
+            await asyncio.wait(list(self._handlers), timeout=timeout)
+
+    async def respond(self, line: bytes) -> dict:
+        self.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            request_id = request.get('id')
+            response = await self.handle(request)
+        except RequestError as e:
+            response = {'ok': False, **e.fields}
+        except ValueError as e:  # invalid JSON or UTF-8
+            response = {'ok': False, 'error': f"invalid request: {e}"}
+        except Exception as e:
+            # anything else fails this request only, the connection stays open
+            response = {'ok': False, 'error': f"internal error: {e!r}"}
+        if not response['ok']:
+            self.errors += 1
+        if request_id is not None:
+            response['id'] = request_id
+        return response
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._handlers[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # longer than max_line, the rest of it cannot be skipped reliably
+                    writer.write(b'{"ok": false, "error": "request line too long"}\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    response = await self.respond(line)
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            del self._handlers[asyncio.current_task()]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+async def serve(service: MatchService, unix: Optional[str] = None, host: str = '127.0.0.1',
+                port: int = DEFAULT_PORT, ready=None):
+    # listen on the Unix socket path (or host:port) until SIGINT/SIGTERM, ready(address)
+    # is called once the socket accepts connections
+    service.start()
+    if unix is not None:
+        server = await asyncio.start_unix_server(service.serve_connection, path=unix, limit=service.max_line)
+        address = unix
+    else:
+        server = await asyncio.start_server(service.serve_connection, host, port, limit=service.max_line)
+        address = "%s:%d" % server.sockets[0].getsockname()[:2]
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):  # Windows, or not the main thread
+            pass
+    try:
+        async with server:
+            if ready is not None:
+                ready(address)
+            await stop.wait()
+            server.close()
+            await service.disconnect()
+    finally:
+        service.close()
+        if unix is not None and os.path.exists(unix):
+            os.unlink(unix)
+
+if __name__ == "__main__":
+    # serve on a temporary Unix socket and answer a few requests from a client connection
+    async def demo():
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".service-demo.sock")
+        listening = asyncio.Event()
+        server = asyncio.ensure_future(serve(MatchService(jobs=1), unix=path, ready=lambda _: listening.set()))
+        await listening.wait()
+
+        reader, writer = await asyncio.open_unix_connection(path)
+        for request in [{"id": 1, "op": "compile", "regex": "a(b|c)*"},
+                        {"id": 2, "op": "match", "regex": "a(b|c)*", "text": "abcbc"},
+                        {"id": 3, "op": "match", "regex": "a(b|c)*", "texts": ["a", "ad", "acb"]},
+                        {"id": 4, "op": "compile", "regex": "a(b|"},
+                        {"id": 5, "op": "stats"}]:
+            writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+            print(f"{json.dumps(request)}\n  -> {(await reader.readline()).decode().strip()}")
+        writer.close()
+        await writer.wait_closed()
+        os.kill(os.getpid(), signal.SIGTERM)
+        await server
+
+    if sys.platform == "win32":
+        print("the demo needs Unix sockets")
+    else:
+        asyncio.run(demo())
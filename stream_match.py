@@ -0,0 +1,73 @@
+# incremental matching of input that arrives in chunks (sockets, large files),
+# the current DFA state is kept between chunks so the input never has to be held
+# in memory as a whole
+import codecs
+import mmap
+import os
+from typing import Optional
+
+from compiled_dfa import CompiledDFA, DEAD_STATE
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+class StreamMatcher:
+    def __init__(self, compiled: CompiledDFA, encoding: Optional[str] = None):
+        # bytes chunks are read as latin-1 (one symbol per byte) unless an encoding
+        # is given, in which case they are decoded incrementally
+        self.compiled = compiled
+        self.encoding = encoding
+        self.reset()
+
+    def reset(self):
+        self.state = self.compiled.start_state
+        self.consumed = 0  # symbols (or bytes) read so far
+        self._decoder = codecs.getincrementaldecoder(self.encoding)() if self.encoding else None
+
+    @property
+    def dead(self) -> bool:
+        # once dead no further input can make the stream match
+        return self.state == DEAD_STATE
+
+    def feed(self, chunk) -> bool:
+        # consume a str or bytes chunk, returns False as soon as the automaton is
+        # in the dead state (the caller can stop reading)
+        if self.state == DEAD_STATE:
+            return False
+        if self._decoder is not None and not isinstance(chunk, str):
+            chunk = self._decoder.decode(chunk)
+        self.state = self.compiled.run(chunk, self.state)
+        self.consumed += len(chunk)
+        return self.state != DEAD_STATE
+
+    def finish(self) -> bool:
+        # verdict for everything fed so far
+        if self._decoder is not None and self.state != DEAD_STATE:
+            self.feed(self._decoder.decode(b'', final=True))
+        return self.compiled.is_accepting(self.state)
+
+def match_stream(compiled: CompiledDFA, stream, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 encoding: Optional[str] = None) -> bool:
+    # match a file-like object (text or binary) read in chunks, stops reading early
+    # once the automaton reaches the dead state
+    matcher = StreamMatcher(compiled, encoding)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk or not matcher.feed(chunk):
+            break
+    return matcher.finish()
+
+def match_file(compiled: CompiledDFA, path: str, use_mmap: bool = True,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, encoding: Optional[str] = None) -> bool:
+    # match the whole content of a file, either through a read-only memory map or
+    # with buffered reads, in both cases at most chunk_size bytes are copied at a time
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not use_mmap or size == 0:
+            return match_stream(compiled, f, chunk_size, encoding)
+
+        matcher = StreamMatcher(compiled, encoding)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(0, size, chunk_size):
+                if not matcher.feed(mapped[start:start + chunk_size]):
+                    break
+        return matcher.finish()
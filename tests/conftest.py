@@ -0,0 +1,7 @@
+# the modules live flat in the repository root and import each other by bare name
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,41 @@
+# entries of the JSON test suites in the repository root, shared by the tests
+import itertools
+import json
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_suites():
+    # (name, regex, [(input, expected), ...]) of every entry of every suite file
+    entries = []
+    for filename in sorted(os.listdir(ROOT)):
+        if filename.endswith('.json'):
+            with open(os.path.join(ROOT, filename), 'r') as f:
+                for test in json.load(f):
+                    entries.append((test['name'], test['regex'],
+                                    [(case['input'], case['expected']) for case in test['test_strings']]))
+    return entries
+
+SUITE = load_suites()
+SUITE_IDS = [entry[0] for entry in SUITE]
+
+# patterns checked against Python's re on every string over ALPHABET up to length 4
+ALPHABET = "abcx1"
+CLASS_PATTERNS = ["[a-c]x", "[^ab]+", "a.c*", r"\d+x?", r"\w\W?b|[^\d]a", "[a-c1]*[^c]"]
+COUNTED_PATTERNS = ["a{3}", "(ab){2,}", "a{0,3}b", "(a|bc){1,3}x{2,}", "((a|b){2}c){1,2}",
+                    "[a-c]{2}(b|c){1,3}", "([ab]1|c{2,3})*", "(a?){2,3}x"]
+
+def reference_entry(regex):
+    texts = ["".join(chars) for length in range(5) for chars in itertools.product(ALPHABET, repeat=length)]
+    return (regex, regex, [(text, re.fullmatch(regex, text) is not None) for text in texts])
+
+def check(match, cases):
+    # match(text) answers every (text, expected) case
+    for text, expected in cases:
+        assert match(text) == expected, text
+
+# the suites plus the reference patterns, what the engine comparisons run on
+REFERENCE_PATTERNS = CLASS_PATTERNS + COUNTED_PATTERNS
+ENTRIES = SUITE + [reference_entry(regex) for regex in REFERENCE_PATTERNS]
+ENTRY_IDS = SUITE_IDS + REFERENCE_PATTERNS
@@ -0,0 +1,23 @@
+import pytest
+
+import batch_match
+from suites import ENTRIES, ENTRY_IDS
+from pattern_cache import compile_regex
+from batch_match import match_batch
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_batch_matches_expected(name, regex, cases):
+    compiled = compile_regex(regex)
+    texts = [text for text, _ in cases]
+    expected = [expected for _, expected in cases]
+    assert [bool(verdict) for verdict in match_batch(compiled, texts)] == expected
+    # a stream of inputs consumed in small chunks, in input order
+    assert [bool(verdict) for verdict in match_batch(compiled, iter(texts), batch_size=7)] == expected
+
+def test_empty_batch():
+    assert len(match_batch(compile_regex("a*"), [])) == 0
+
+def test_without_numpy(monkeypatch):
+    # numpy is optional, every string is then matched on its own
+    monkeypatch.setattr(batch_match, '_import_numpy', lambda: None)
+    assert match_batch(compile_regex("(ab)+"), ["ab", "", "aba", "abab"]) == [True, False, False, True]
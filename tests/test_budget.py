@@ -0,0 +1,65 @@
+import pytest
+
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import Budget, StateExplosionError, subset_construction, subset_construction_bitset
+from followpos_dfa import followpos_construction
+from dfa_minimizer import minimize_dfa
+from main import process_test_json
+
+# 2^(20+1) DFA states
+EXPLODING = "(a|b)*a(a|b){20}"
+
+def thompson_set(postfix, budget):
+    return subset_construction(thompson_construction(postfix, arena=True), budget=budget)
+
+def thompson_bitset(postfix, budget):
+    return subset_construction_bitset(thompson_construction(postfix, arena=True), budget=budget)
+
+def followpos(postfix, budget):
+    return followpos_construction(postfix, budget=budget)
+
+CONSTRUCTIONS = [thompson_set, thompson_bitset, followpos]
+
+@pytest.mark.parametrize("construction", CONSTRUCTIONS)
+def test_max_states(construction):
+    with pytest.raises(StateExplosionError) as error:
+        construction(regex_to_postfix(EXPLODING), Budget(max_states=100))
+    assert error.value.limit == 'max_states'
+    stats = error.value.stats
+    # checked once per processed state, overshoots by at most the transitions of one state
+    assert 100 < stats['dfa_states'] <= 102
+    assert stats['dfa_transitions'] > 0 and stats['pending_states'] > 0 and stats['seconds'] >= 0
+
+@pytest.mark.parametrize("construction", CONSTRUCTIONS)
+def test_max_transitions(construction):
+    with pytest.raises(StateExplosionError) as error:
+        construction(regex_to_postfix(EXPLODING), Budget(max_transitions=50))
+    assert error.value.limit == 'max_transitions'
+    assert 50 < error.value.stats['dfa_transitions'] <= 52
+
+@pytest.mark.parametrize("construction", CONSTRUCTIONS)
+def test_timeout(construction):
+    with pytest.raises(StateExplosionError) as error:
+        construction(regex_to_postfix(EXPLODING), Budget(timeout=0.05))
+    assert error.value.limit == 'timeout'
+    assert error.value.stats['seconds'] >= 0.05
+    assert error.value.stats['dfa_states'] > 0
+
+@pytest.mark.parametrize("construction", CONSTRUCTIONS)
+def test_within_budget(construction):
+    dfa = construction(regex_to_postfix("(a|b)*a(a|b){3}"), Budget(max_states=100, max_transitions=200, timeout=10))
+    assert len(minimize_dfa(dfa).states) == 16
+
+@pytest.mark.parametrize("engine", ['thompson', 'followpos'])
+def test_main_reports_state_explosion(engine):
+    test = {'name': 'explodes', 'regex': EXPLODING, 'test_strings': [{'input': 'ab', 'expected': False}]}
+    result = process_test_json(test, budget=Budget(max_states=100), engine=engine)
+    assert not result['success']
+    assert result['error_type'] == 'state_explosion'
+    assert result['partial_stats']['dfa_states'] > 100
+
+def test_main_rejects_budget_in_lazy_mode():
+    test = {'name': 'lazy', 'regex': 'ab', 'test_strings': []}
+    with pytest.raises(ValueError):
+        process_test_json(test, lazy=True, budget=Budget(max_states=100))
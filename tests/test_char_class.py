@@ -0,0 +1,45 @@
+import pytest
+
+from suites import CLASS_PATTERNS, reference_entry, check
+from char_class import CharSet, ANY, MAX_CODEPOINT, partition, symbol_classes, SymbolMap
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction, simulate_dfa
+
+def test_charset_ranges_are_merged():
+    assert CharSet([(5, 9), (1, 3), (4, 4), (20, 30), (25, 40)]).ranges == ((1, 9), (20, 40))
+    assert 'b' in CharSet.of("abc") and 'd' not in CharSet.of("abc")
+    assert len(CharSet([(ord('a'), ord('z'))])) == 26
+
+def test_negate():
+    digits = CharSet([(ord('0'), ord('9'))])
+    assert digits.negate().ranges == ((0, ord('0') - 1), (ord('9') + 1, MAX_CODEPOINT))
+    assert digits.negate().negate() == digits
+    assert ANY.negate().ranges == ()
+
+def test_partition_is_disjoint_and_covers_the_labels():
+    labels = [CharSet([(ord('a'), ord('m'))]), CharSet([(ord('h'), ord('z'))]), 'c', 'q']
+    atoms = partition(labels)
+    covered = {}
+    for atom, indexes in atoms:
+        for lo, hi in (atom.ranges if isinstance(atom, CharSet) else [(ord(atom), ord(atom))]):
+            for codepoint in range(lo, hi + 1):
+                assert codepoint not in covered
+                covered[codepoint] = sorted(indexes)
+    for codepoint in range(ord('a'), ord('z') + 1):
+        char = chr(codepoint)
+        assert covered[codepoint] == [i for i, label in enumerate(labels)
+                                      if (char in label if isinstance(label, CharSet) else char == label)]
+
+def test_symbol_map():
+    classes = symbol_classes([CharSet([(ord('a'), ord('f'))]), 'c', 'x'])
+    symbols = SymbolMap({symbol: symbol for symbol in classes})
+    assert symbols.lookup('c') == 'c' and symbols.lookup('x') == 'x'
+    assert symbols.lookup('a') == symbols.lookup('f') != 'c'
+    assert symbols.lookup('z') is None
+
+@pytest.mark.parametrize("name, regex, cases", [reference_entry(regex) for regex in CLASS_PATTERNS],
+                         ids=CLASS_PATTERNS)
+def test_class_patterns_match_like_re(name, regex, cases):
+    dfa = subset_construction(thompson_construction(regex_to_postfix(regex), arena=True))
+    check(lambda text: simulate_dfa(dfa, text), cases)
@@ -0,0 +1,33 @@
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import epsilon_closure, subset_construction, simulate_dfa
+
+def nfa_of(regex):
+    return thompson_construction(regex_to_postfix(regex), arena=True)
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_compact_matches_expected(name, regex, cases):
+    nfa = nfa_of(regex)
+    compact = nfa.compact()
+    check(compact.match, cases)
+    assert len(compact) == len(nfa.states)
+    assert len(compact.targets) == sum(len(targets) for state in nfa.states
+                                       for targets in state.transitions.values())
+    for state in range(len(nfa.states)):
+        assert compact.epsilon_closure({state}) == epsilon_closure(nfa, {state})
+
+def test_discarded_subsets():
+    nfa = nfa_of("(a|b)*abb")
+    dfa = subset_construction(nfa)
+    dfa.discard_subsets()
+    assert simulate_dfa(dfa, "aabb") and not simulate_dfa(dfa, "abba")
+    assert dfa.compile().match("babb")
+
+def test_states_have_no_instance_dict():
+    nfa = nfa_of("ab")
+    dfa = subset_construction(nfa)
+    for obj in (nfa.states[0], dfa.states[0], nfa.compact()):
+        assert not hasattr(obj, '__dict__')
@@ -0,0 +1,55 @@
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction, simulate_dfa
+from dfa_minimizer import minimize_dfa
+from compiled_dfa import CompiledDFA, DEAD_STATE, load_compiled
+
+def dfa_of(regex):
+    return subset_construction(thompson_construction(regex_to_postfix(regex), arena=True))
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_compiled_matches_like_the_dfa(name, regex, cases):
+    dfa = dfa_of(regex)
+    compiled = dfa.compile()
+    check(compiled.match, cases)
+    check(lambda text: simulate_dfa(dfa, text), cases)
+    # bytes are read as latin-1 characters
+    check(compiled.match, [(text.encode('latin-1'), expected) for text, expected in cases
+                           if all(ord(c) < 256 for c in text)])
+
+def test_symbols_with_the_same_column_share_a_class():
+    # minimized, a, b and c then lead to the same states
+    compiled = CompiledDFA.from_dfa(minimize_dfa(dfa_of("(a|b|c)*d")))
+    assert compiled.class_of('a') == compiled.class_of('b') == compiled.class_of('c') != compiled.class_of('d')
+    assert compiled.num_classes == 3  # a/b/c, d and every other character
+
+def test_run_stops_in_the_dead_state():
+    compiled = dfa_of("ab*").compile()
+    assert compiled.run("x" + "b" * 1000) == DEAD_STATE
+    assert compiled.is_accepting(compiled.run("abbb"))
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_serialization_round_trip(name, regex, cases, tmp_path):
+    compiled = CompiledDFA.from_dfa(minimize_dfa(dfa_of(regex)))
+    data = compiled.to_bytes()
+    loaded = CompiledDFA.from_buffer(data)
+    assert loaded.to_bytes() == data
+    check(loaded.match, cases)
+    path = str(tmp_path / "pattern.dfa")
+    compiled.save(path)
+    for use_mmap in (True, False):
+        check(load_compiled(path, use_mmap=use_mmap).match, cases)
+
+@pytest.mark.parametrize("corrupt, message", [
+    (lambda data: data[:10], "truncated header"),
+    (lambda data: b'X' + data[1:], "bad magic"),
+    (lambda data: data[:6] + b'\x09\x00' + data[8:], "version: 9"),
+    (lambda data: data[:-1], "truncated data"),
+])
+def test_invalid_data_is_rejected(corrupt, message):
+    data = dfa_of("(a|b)*c").compile().to_bytes()
+    with pytest.raises(ValueError, match=message):
+        CompiledDFA.from_buffer(corrupt(data))
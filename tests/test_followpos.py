@@ -0,0 +1,28 @@
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction, simulate_dfa
+from dfa_minimizer import minimize_dfa
+from followpos_dfa import followpos_construction
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_followpos_matches_expected(name, regex, cases):
+    postfix = regex_to_postfix(regex)
+    followpos = followpos_construction(postfix)
+    check(lambda text: simulate_dfa(followpos, text), cases)
+    # same language as the Thompson DFA, so both minimize to the same number of states
+    thompson = subset_construction(thompson_construction(postfix, arena=True))
+    assert len(minimize_dfa(followpos).states) == len(minimize_dfa(thompson).states)
+
+@pytest.mark.parametrize("regex, positions", [
+    ("a{1000}", 1000),
+    ("a{0,1000}", 1000),
+    ("(ab){10,}", 20),
+    ("(a{10}b){10}", 110),
+])
+def test_counts_copy_positions_once(regex, positions):
+    stats = {}
+    followpos_construction(regex_to_postfix(regex), stats)
+    assert stats['positions'] == positions
@@ -0,0 +1,68 @@
+import random
+import re
+
+import pytest
+
+from grep import compile_grep, grep_file
+from main import run_grep
+
+PATTERNS = ["ab+c", "(a|b)*ab", "x{2,3}", r"\d\d", "é", "caf.", "本", "[à-ÿ]+", "[^a-z ]", "a.b"]
+WORDS = ["abc", "abbbc", "ba", "xx", "xyx", "12", "7", "café", "naïve", "本", "日本語", "aéb", "a b", "z", ""]
+
+def make_lines(seed: int, count: int = 400):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 6))) for _ in range(count)]
+
+def expected(regex, lines, whole_line):
+    # (byte offset, line) of the lines re finds a match in (or that match as a whole)
+    result = []
+    offset = 0
+    for line in lines:
+        found = re.fullmatch(regex, line) if whole_line else re.search(regex, line)
+        if found:
+            result.append((offset, line.encode('utf-8')))
+        offset += len(line.encode('utf-8')) + 1
+    return result
+
+@pytest.fixture(scope="module")
+def text_file(tmp_path_factory):
+    lines = make_lines(0)
+    path = tmp_path_factory.mktemp("grep") / "lines.txt"
+    # no newline after the last line
+    path.write_bytes("\n".join(lines).encode('utf-8'))
+    return str(path), lines
+
+@pytest.mark.parametrize("whole_line", [False, True])
+@pytest.mark.parametrize("regex", PATTERNS)
+def test_lines_and_offsets(regex, whole_line, text_file):
+    path, lines = text_file
+    compiled = compile_grep(regex, whole_line=whole_line)
+    reference = expected(regex, lines, whole_line)
+    # 64 byte chunks end in the middle of lines and of UTF-8 characters
+    for jobs in (1, 4):
+        result = grep_file(compiled, path, jobs=jobs, chunk_size=64)
+        assert result.matches == reference
+        assert result.count == len(reference)
+        assert result.scanned == len("\n".join(lines).encode('utf-8'))
+        assert grep_file(compiled, path, collect=False, jobs=jobs, chunk_size=64).count == len(reference)
+
+@pytest.mark.parametrize("args, output", [
+    (["-c", "caf."], "1\n"),
+    (["é"], "café\naéb\n"),
+    (["-b", "é"], "0:café\n6:aéb\n"),
+    (["-x", "a.b"], "aéb\n"),
+    (["-c", "--jobs", "4", "a"], "3\n"),
+])
+def test_command_line(args, output, tmp_path, capfdbinary):
+    path = tmp_path / "small.txt"
+    path.write_bytes("café\naéb\nnaïve\n".encode('utf-8'))
+    assert run_grep(args + [str(path)]) == 0
+    assert capfdbinary.readouterr().out == output.encode('utf-8')
+
+def test_exit_status(tmp_path, capsys):
+    path = tmp_path / "small.txt"
+    path.write_text("abc\n")
+    assert run_grep(["x", str(path)]) == 1
+    assert run_grep(["x", str(tmp_path / "missing.txt")]) == 2
+    assert "missing.txt: No such file or directory" in capsys.readouterr().err
+    assert run_grep(["a(", str(path)]) == 2
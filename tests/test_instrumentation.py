@@ -0,0 +1,65 @@
+import pytest
+
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction
+from instrumentation import StageProfile, nfa_stats, dfa_stats, format_profile, stage_totals
+from main import process_test_json
+
+TEST = {'name': 'abb', 'regex': '(a|b)*abb', 'test_strings': [
+    {'input': 'aabb', 'expected': True}, {'input': 'ab', 'expected': False}]}
+
+def run(**options):
+    calls = []
+    result = process_test_json(TEST, hook=lambda stage, stats: calls.append((stage, stats)), **options)
+    assert result['success']
+    return result, calls
+
+def test_hook_sees_every_stage_with_its_counts():
+    result, calls = run(minimize=True)
+    assert [stage for stage, _ in calls] == ['postfix', 'nfa', 'subset', 'minimize', 'match']
+    stats = dict(calls)
+    assert all(s['seconds'] >= 0 for s in stats.values())
+    postfix = regex_to_postfix(TEST['regex'])
+    assert stats['postfix']['tokens'] == len(postfix)
+    nfa = thompson_construction(postfix, arena=True)
+    assert stats['nfa']['nfa_states'] == len(nfa.states) == 14
+    assert stats['nfa']['epsilon_transitions'] == 11
+    assert stats['subset']['dfa_states'] == result['dfa_states'] == 5
+    assert stats['subset']['closures'] > 0
+    assert stats['minimize']['dfa_states'] == result['min_dfa_states'] == 4
+    assert stats['minimize']['dfa_transitions'] == 8 and stats['minimize']['alphabet'] == 2
+    assert stats['match']['inputs'] == 2
+
+def test_followpos_and_lazy_stages():
+    _, calls = run(engine='followpos')
+    assert [stage for stage, _ in calls] == ['postfix', 'followpos', 'match']
+    assert dict(calls)['followpos']['dfa_states'] == 4
+    _, calls = run(lazy=True)
+    assert [stage for stage, _ in calls] == ['postfix', 'nfa', 'lazy_match']
+    assert dict(calls)['lazy_match']['cached_states'] > 0
+
+def test_profile_records_and_forwards():
+    result, calls = run(minimize=True, profile=True)
+    records = result['profile']
+    assert [record['stage'] for record in records] == [stage for stage, _ in calls]
+    assert records[1]['nfa_states'] == 14
+    lines = format_profile(records)
+    assert len(lines) == 5 and 'nfa_states=14' in lines[1] and 'seconds' not in lines[1]
+    totals = stage_totals([result, result])
+    assert totals['minimize'] == pytest.approx(2 * records[3]['seconds'])
+
+def test_stage_profile_copies_stats():
+    profile = StageProfile()
+    stats = {'seconds': 0.5, 'tokens': 3}
+    profile('postfix', stats)
+    stats['tokens'] = 4
+    assert profile.records == [{'seconds': 0.5, 'tokens': 3, 'stage': 'postfix'}]
+
+def test_stats_helpers():
+    nfa = thompson_construction(regex_to_postfix('ab'), arena=True)
+    counts = nfa_stats(nfa)
+    assert counts['nfa_states'] == len(nfa.states)
+    assert counts['nfa_transitions'] >= counts['epsilon_transitions'] + 2
+    dfa = subset_construction(nfa)
+    assert dfa_stats(dfa) == {'dfa_states': len(dfa.states), 'dfa_transitions': 2, 'alphabet': 2}
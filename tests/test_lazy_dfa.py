@@ -0,0 +1,34 @@
+import random
+import re
+
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from lazy_dfa import LazyDFA
+
+def nfa_of(regex):
+    return thompson_construction(regex_to_postfix(regex), arena=True)
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_lazy_matches_expected(name, regex, cases):
+    lazy = LazyDFA(nfa_of(regex))
+    check(lazy.match, cases)
+    # the second pass runs on the cached states
+    check(lazy.match, cases)
+
+def test_small_cache_flushes_and_falls_back():
+    # (a|b)*a(a|b){12} has 2^13 DFA states, far more than the cache holds
+    regex = "(a|b)*a(a|b){12}"
+    lazy = LazyDFA(nfa_of(regex), max_states=64, max_flushes=2)
+    rng = random.Random(0)
+    for _ in range(200):
+        text = "".join(rng.choice("ab") for _ in range(rng.randint(10, 200)))
+        assert lazy.match(text) == (re.fullmatch(regex, text) is not None), text
+        assert lazy.cached_states <= 64
+    assert lazy.flushes > 0 and lazy.fallbacks > 0
+
+def test_symbols_outside_the_alphabet():
+    lazy = LazyDFA(nfa_of("[a-c]+d"))
+    assert lazy.match("abcd") and not lazy.match("abxd") and not lazy.match("")
@@ -0,0 +1,33 @@
+import json
+import os
+
+import pytest
+
+from main import process_tests, process_test_file
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_FILE = os.path.join(ROOT, "LFA-Assignment2_Regex_DFA_v2.json")
+
+def entries():
+    with open(TEST_FILE) as f:
+        tests = json.load(f)
+    # failing entries in between, their results must stay in place too
+    tests.insert(3, {'name': 'bad', 'regex': 'a(', 'test_strings': []})
+    tests.append({'name': 'empty group', 'regex': '()', 'test_strings': []})
+    return tests
+
+@pytest.mark.parametrize("jobs", [2, 4])
+@pytest.mark.parametrize("minimize", [False, True])
+def test_jobs_give_the_same_results_in_input_order(jobs, minimize):
+    tests = entries()
+    serial = process_tests(tests, minimize=minimize, jobs=1)
+    assert [r['name'] for r in serial] == [t['name'] for t in tests]
+    assert process_tests(tests, minimize=minimize, jobs=jobs) == serial
+
+def test_jobs_print_the_same_report(capsys):
+    serial = process_test_file(TEST_FILE, minimize=True, jobs=1)
+    serial_output = capsys.readouterr().out
+    parallel = process_test_file(TEST_FILE, minimize=True, jobs=3)
+    assert capsys.readouterr().out == serial_output
+    assert parallel == serial
+    assert "Tests passed: 20 / 20" in serial_output
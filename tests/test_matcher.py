@@ -0,0 +1,38 @@
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import input_labels, simulate_nfa
+from matcher import (NFAMatcher, build_matcher, choose_engine, DFA_BREAK_EVEN_CHARS_PER_STATE,
+                     DEFAULT_AVERAGE_LENGTH)
+from compiled_dfa import CompiledDFA
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_nfa_simulation_matches_expected(name, regex, cases):
+    nfa = thompson_construction(regex_to_postfix(regex), arena=True)
+    check(lambda text: simulate_nfa(nfa, text), cases)
+    labels = input_labels(nfa)
+    check(lambda text: simulate_nfa(nfa, text, labels), cases)
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_engines_agree(name, regex, cases):
+    for engine in ('nfa', 'dfa'):
+        check(build_matcher(regex, engine).match, cases)
+
+def test_choose_engine_thresholds():
+    nfa = thompson_construction(regex_to_postfix("(a|b)*abb"), arena=True)
+    # break even at DFA_BREAK_EVEN_CHARS_PER_STATE simulated characters per NFA state
+    break_even = DFA_BREAK_EVEN_CHARS_PER_STATE * len(nfa.states)
+    assert choose_engine(nfa, None) == 'dfa'
+    assert choose_engine(nfa, 1) == 'nfa'
+    assert choose_engine(nfa, break_even // DEFAULT_AVERAGE_LENGTH + 1) == 'dfa'
+    assert choose_engine(nfa, 1, average_length=break_even - 1) == 'nfa'
+    assert choose_engine(nfa, 1, average_length=break_even) == 'dfa'
+
+def test_build_matcher():
+    assert isinstance(build_matcher("ab*", expected_inputs=1, average_length=1), NFAMatcher)
+    assert isinstance(build_matcher("ab*", expected_inputs=10 ** 6), CompiledDFA)
+    assert isinstance(build_matcher("ab*"), CompiledDFA)
+    with pytest.raises(ValueError):
+        build_matcher("ab*", engine='backtracking')
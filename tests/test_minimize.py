@@ -0,0 +1,37 @@
+import itertools
+
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction, subset_construction_bitset, simulate_dfa
+from dfa_minimizer import minimize_dfa
+
+def dfa_pair(regex):
+    dfa = subset_construction(thompson_construction(regex_to_postfix(regex), arena=True))
+    return dfa, minimize_dfa(dfa)
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_minimized_matches_suite(name, regex, cases):
+    dfa, minimized = dfa_pair(regex)
+    assert len(minimized.states) <= len(dfa.states)
+    check(lambda text: simulate_dfa(dfa, text), cases)
+    check(lambda text: simulate_dfa(minimized, text), cases)
+    # the DFA of the bitset construction minimizes to the same size
+    bitset_dfa = subset_construction_bitset(thompson_construction(regex_to_postfix(regex), arena=True))
+    assert len(minimize_dfa(bitset_dfa).states) == len(minimized.states)
+
+@pytest.mark.parametrize("regex", ["(a|b)*abb", "(a|b)*a(a|b){3}", "a*b*|b*a*", "(ab|a)(ba|b)*", "[ab]{2,4}c?"])
+def test_minimized_agrees_on_all_short_strings(regex):
+    dfa, minimized = dfa_pair(regex)
+    for length in range(7):
+        for chars in itertools.product("abc", repeat=length):
+            text = "".join(chars)
+            assert simulate_dfa(dfa, text) == simulate_dfa(minimized, text), text
+
+def test_minimized_size_is_minimal():
+    # (a|b)*a(a|b){n} needs 2^(n+1) states, (a|b)*abb needs 4
+    assert len(dfa_pair("(a|b)*a(a|b){3}")[1].states) == 16
+    assert len(dfa_pair("(a|b)*abb")[1].states) == 4
+    assert len(dfa_pair("(a|b)*abb|(a|b)*abb")[1].states) == 4
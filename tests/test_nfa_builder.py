@@ -0,0 +1,22 @@
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction, simulate_dfa, simulate_nfa
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_copy_and_arena_construction(name, regex, cases):
+    postfix = regex_to_postfix(regex)
+    for arena in (False, True):
+        nfa = thompson_construction(postfix, arena=arena)
+        check(lambda text: simulate_nfa(nfa, text), cases)
+        dfa = subset_construction(nfa)
+        check(lambda text: simulate_dfa(dfa, text), cases)
+
+def test_arena_construction_is_linear():
+    # two states per operand and per operator at most, whatever the nesting
+    for length in (100, 1000, 10000):
+        regex = "(a|b)*c" * (length // 7)
+        postfix = regex_to_postfix(regex)
+        assert len(thompson_construction(postfix, arena=True).states) <= 2 * len(postfix)
@@ -0,0 +1,24 @@
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from regex_to_postfix import regex_to_postfix
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction, subset_construction_bitset, simulate_dfa
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_set_and_bitset_construction(name, regex, cases):
+    nfa = thompson_construction(regex_to_postfix(regex), arena=True)
+    dfa, bitset_dfa = subset_construction(nfa), subset_construction_bitset(nfa)
+    # the same DFA up to state numbering: the same NFA subsets
+    assert sorted(map(sorted, (s.nfa_states for s in bitset_dfa.states))) == \
+        sorted(map(sorted, (s.nfa_states for s in dfa.states)))
+    check(lambda text: simulate_dfa(dfa, text), cases)
+    check(lambda text: simulate_dfa(bitset_dfa, text), cases)
+
+def test_bitset_without_subsets():
+    nfa = thompson_construction(regex_to_postfix("(a|b)*abb"), arena=True)
+    stats = {}
+    dfa = subset_construction_bitset(nfa, stats, keep_subsets=False)
+    assert len(dfa.states) == len(subset_construction(nfa).states)
+    assert stats['closures'] > 0 and stats['unions'] > 0
+    assert simulate_dfa(dfa, "babb") and not simulate_dfa(dfa, "bab")
@@ -0,0 +1,72 @@
+import pytest
+
+import pattern_cache
+from pattern_cache import PatternCache, compile_regex
+from nfa_to_dfa import Budget, StateExplosionError
+
+def test_hit_returns_the_cached_automaton():
+    cache = PatternCache()
+    first = cache.get("(a|b)*c")
+    assert cache.get("(a|b)*c") is first
+    info = cache.info()
+    assert (info.hits, info.misses, info.entries, info.states) == (1, 1, 1, first.num_states)
+    assert first.match("abac") and not first.match("abca")
+
+def test_keyed_by_the_exact_pattern():
+    # equivalent patterns are different keys, each compiled once
+    cache = PatternCache()
+    patterns = ["a|b", "b|a", "[ab]", "(a|b)"]
+    compiled = [cache.get(regex) for regex in patterns]
+    assert len({id(c) for c in compiled}) == len(patterns)
+    assert [cache.get(regex) for regex in patterns] == compiled
+    info = cache.info()
+    assert (info.hits, info.misses, info.entries) == (4, 4, 4)
+
+def test_evicts_least_recently_used():
+    cache = PatternCache(max_entries=2)
+    a = cache.get("a")
+    cache.get("b")
+    cache.get("a")        # b is now the least recently used
+    cache.get("c")
+    info = cache.info()
+    assert (info.entries, info.evictions) == (2, 1)
+    assert cache.lookup("a") is a
+    assert cache.lookup("b") is None
+    assert cache.lookup("c") is not None
+
+def test_evicts_by_total_states():
+    cache = PatternCache()
+    small = cache.get("a")
+    big = cache.get("abcdefgh")
+    cache.configure(max_states=big.num_states)
+    # the oldest entry goes first until the total fits
+    assert cache.info().entries == 1 and cache.info().states == big.num_states
+    assert cache.lookup("abcdefgh") is big and cache.lookup("a") is None
+    # an automaton larger than max_states is returned but not cached
+    cache.configure(max_states=small.num_states)
+    assert cache.get("abcdefghij").match("abcdefghij")
+    assert cache.lookup("abcdefghij") is None
+
+def test_store_and_clear():
+    cache = PatternCache()
+    compiled = compile_regex("x+")
+    assert cache.lookup("x+") is None
+    cache.store("x+", compiled)
+    assert cache.get("x+") is compiled
+    cache.clear()
+    assert cache.info().entries == 0 and cache.lookup("x+") is None
+
+def test_budget_applies_on_a_miss():
+    cache = PatternCache(budget=Budget(max_states=50))
+    with pytest.raises(StateExplosionError):
+        cache.get("(a|b)*a(a|b){10}")
+    assert cache.info().entries == 0
+
+def test_module_cache():
+    pattern_cache.purge()
+    before = pattern_cache.cache_info()
+    compiled = pattern_cache.compile("ab*c")
+    assert pattern_cache.compile("ab*c") is compiled
+    info = pattern_cache.cache_info()
+    assert (info.hits - before.hits, info.misses - before.misses, info.entries) == (1, 1, 1)
+    pattern_cache.purge()
@@ -0,0 +1,43 @@
+import itertools
+import re
+
+import pytest
+
+from regex_set import RegexSet
+
+# overlapping patterns: many strings match several of them, and several accepting
+# states differ only by the ids they carry
+PATTERN_SETS = [
+    ["a*", "a+", "aa", "(a|b)*", "b*"],
+    ["ab", "a(b|c)", "[a-c]b", "abc?", "x"],
+    ["(a|b)*a", "(a|b)*b", "(ab)*", "a{2,3}", "[^c]*"],
+    ["a", "a", "b"],
+]
+
+def texts(alphabet="abcx", length=5):
+    for n in range(length + 1):
+        for chars in itertools.product(alphabet, repeat=n):
+            yield "".join(chars)
+
+@pytest.mark.parametrize("minimize", [True, False])
+@pytest.mark.parametrize("patterns", PATTERN_SETS)
+def test_matches_equal_fullmatch_per_pattern(patterns, minimize):
+    regex_set = RegexSet(patterns, minimize=minimize)
+    for text in texts():
+        expected = [i for i, pattern in enumerate(patterns) if re.fullmatch(pattern, text)]
+        assert regex_set.matches(text) == expected, text
+        assert regex_set.match_any(text) == bool(expected), text
+
+def test_minimization_keeps_different_ids_apart():
+    # the states after "a" and after "b" only differ by their ids, merging them
+    # would report the same ids for both strings
+    regex_set = RegexSet(["a", "b", "c|b"])
+    assert regex_set.matches("a") == [0]
+    assert regex_set.matches("b") == [1, 2]
+    assert regex_set.matches("c") == [2]
+    # still smaller than the unminimized DFA
+    assert regex_set.dfa_states <= RegexSet(["a", "b", "c|b"], minimize=False).dfa_states
+
+def test_invalid_pattern_names_its_index():
+    with pytest.raises(ValueError, match="#1"):
+        RegexSet(["a", "(b"])
@@ -0,0 +1,80 @@
+import pytest
+
+from suites import COUNTED_PATTERNS, reference_entry, check
+from regex_to_postfix import regex_to_postfix, RegexSyntaxError, Repeat, MAX_EXPANDED_SIZE
+from nfa_builder import thompson_construction
+from nfa_to_dfa import subset_construction, simulate_dfa
+from matcher import build_matcher
+
+@pytest.mark.parametrize("regex, postfix", [
+    ("a{3}", ['a', Repeat(3, 3)]),
+    ("a{2,}", ['a', Repeat(2, None)]),
+    ("(ab){0,4}c", ['a', 'b', '.', Repeat(0, 4), 'c', '.']),
+])
+def test_repeat_tokens(regex, postfix):
+    assert regex_to_postfix(regex) == postfix
+
+@pytest.mark.parametrize("name, regex, cases", [reference_entry(regex) for regex in COUNTED_PATTERNS],
+                         ids=COUNTED_PATTERNS)
+def test_counted_patterns_match_like_re(name, regex, cases):
+    dfa = subset_construction(thompson_construction(regex_to_postfix(regex), arena=True))
+    check(lambda text: simulate_dfa(dfa, text), cases)
+
+@pytest.mark.parametrize("regex, position", [
+    ("((a{1000}){1000}){1000}", 10),
+    ("(a{1000}){101}", 9),
+    ("a{1000}" * 101, 701),
+])
+def test_counts_expanding_past_the_limit(regex, position):
+    with pytest.raises(RegexSyntaxError) as error:
+        regex_to_postfix(regex)
+    assert error.value.position == position
+    assert str(MAX_EXPANDED_SIZE) in error.value.message
+
+def test_counts_up_to_the_limit():
+    assert regex_to_postfix("(a{1000}){100}") == ['a', Repeat(1000, 1000), Repeat(100, 100)]
+
+def test_long_literal_is_not_limited():
+    # only the positions added by counts are limited, not the ones written out
+    text = 'a' * 150_000
+    assert len(regex_to_postfix(text + 'b{2}')) == 2 * 150_000 + 2
+    matcher = build_matcher(text + 'b{2}', expected_inputs=1)
+    assert matcher.match(text + 'bb')
+    assert not matcher.match(text[1:] + 'bb')
+
+@pytest.mark.parametrize("regex, message, position", [
+    ("a)", "Unmatched ')'", 1),
+    ("ab)c", "Unmatched ')'", 2),
+    ("(ab", "Unclosed '('", 0),
+    ("a(b(c)", "Unclosed '('", 1),
+    ("()", "Empty group", 0),
+    ("a(()b)", "Empty group", 2),
+    ("*a", "Nothing to repeat with '*'", 0),
+    ("a|+b", "Nothing to repeat with '+'", 2),
+    ("(?a)", "Nothing to repeat with '?'", 1),
+    ("ab\\", "Trailing backslash", 2),
+    ("[z-a]", "Invalid range z-a in character class", 1),
+    ("x[ab-a]", "Invalid range b-a in character class", 3),
+    ("a(|b)", "Missing operand before '|'", 2),
+    ("(a|)", "Missing operand before ')'", 3),
+    ("[abc", "Unterminated character class", 0),
+    ("a{3,2}", "Invalid repetition {3,2}: min is larger than max", 1),
+    ("", "Empty pattern", 0),
+    ("a|", "Unexpected end of pattern", 2),
+])
+def test_syntax_error_positions(regex, message, position):
+    with pytest.raises(RegexSyntaxError) as error:
+        regex_to_postfix(regex)
+    assert (error.value.message, error.value.position) == (message, position)
+
+def test_long_pattern():
+    # 100k symbols: groups of an alternation with an escaped '.'
+    regex = r"(a|\.)" * 16_667
+    postfix = regex_to_postfix(regex)
+    # 3 tokens per group and a concatenation between groups
+    assert len(postfix) == 3 * 16_667 + 16_666
+    assert postfix[1] != '.' and postfix[-1] == '.'
+    with pytest.raises(RegexSyntaxError) as error:
+        regex_to_postfix(regex + ")")
+    assert (error.value.message, error.value.position) == ("Unmatched ')'", len(regex))
+    assert regex_to_postfix("(" * 50_000 + "a" + ")" * 50_000) == ['a']
@@ -0,0 +1,67 @@
+import itertools
+import random
+import re
+
+import pytest
+
+from search import Searcher
+
+def leftmost_longest(regex, text, pos=0):
+    # reference (start, end): the smallest start with a match, the longest match there
+    for start in range(pos, len(text) + 1):
+        ends = [end for end in range(start, len(text) + 1) if re.fullmatch(regex, text[start:end])]
+        if ends:
+            return start, max(ends)
+    return None
+
+def all_leftmost_longest(regex, text):
+    matches = []
+    pos = 0
+    while pos <= len(text):
+        found = leftmost_longest(regex, text, pos)
+        if found is None:
+            break
+        matches.append(found)
+        pos = found[1] if found[1] > found[0] else found[0] + 1
+    return matches
+
+def texts(alphabet="abc", length=5):
+    for n in range(length + 1):
+        for chars in itertools.product(alphabet, repeat=n):
+            yield "".join(chars)
+
+# re is leftmost-first: on a|ab it finds "a" where the longest match is "ab"
+LONGEST_PATTERNS = ["a|ab", "(a|b)*b", "b(c|cc)", "a*", "(ab)*", "c?", "[ab]{2,3}"]
+# greedy patterns with one way to match, leftmost-first and leftmost-longest agree
+GREEDY_PATTERNS = ["ab*", "a+", "[0-9]+", "x*", "b[^b]*"]
+
+@pytest.mark.parametrize("regex", LONGEST_PATTERNS)
+def test_search_is_leftmost_longest(regex):
+    searcher = Searcher(regex)
+    for text in texts():
+        assert searcher.search(text) == leftmost_longest(regex, text), text
+        assert searcher.findall(text) == all_leftmost_longest(regex, text), text
+        assert searcher.contains(text) == (re.search(regex, text) is not None), text
+
+@pytest.mark.parametrize("regex", GREEDY_PATTERNS)
+def test_greedy_patterns_find_what_re_finds(regex):
+    searcher = Searcher(regex)
+    rng = random.Random(0)
+    for _ in range(300):
+        text = "".join(rng.choice("ab01x ") for _ in range(rng.randint(0, 30)))
+        found = re.search(regex, text)
+        assert searcher.search(text) == (found.span() if found else None), text
+        assert searcher.findall(text) == [m.span() for m in re.finditer(regex, text)], text
+
+def test_empty_matches_and_matches_at_the_end():
+    searcher = Searcher("a*")
+    # an empty match at every position without an a, including the end of the input
+    assert searcher.findall("baaac") == [(0, 0), (1, 4), (4, 4), (5, 5)]
+    assert searcher.findall("") == [(0, 0)]
+    assert Searcher("ab").findall("xxab") == [(2, 4)]
+    assert Searcher("b+").search("aabbb") == (2, 5)
+    assert Searcher("ab").search("abxab", 1) == (3, 5)
+    assert Searcher("ab").search("aab", 3) is None
+
+def test_symbols_outside_the_pattern_restart_the_search():
+    assert Searcher("abc").findall("ab-abc-abcabc") == [(3, 6), (7, 10), (10, 13)]
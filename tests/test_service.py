@@ -0,0 +1,65 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import service
+from nfa_to_dfa import Budget
+from service import MatchService, RequestError
+
+class BrokenPool(Executor):
+    # every compile fails the way it does when a worker of the pool died
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("a worker died"))
+        return future
+
+    def shutdown(self, wait=True, **kwargs):
+        self.shut_down = True
+
+async def answers(match_service, requests):
+    return [await match_service.respond(line.encode()) for line in requests]
+
+def test_permanent_failures_are_remembered():
+    match_service = MatchService(jobs=0, budget=Budget(max_states=100))
+    requests = ['{"op": "compile", "regex": "a(b|"}', '{"op": "compile", "regex": "(a|b)*a(a|b){10}"}'] * 2
+    first_syntax, first_budget, second_syntax, second_budget = asyncio.run(answers(match_service, requests))
+    assert first_syntax == second_syntax and first_syntax['position'] == 4
+    assert first_budget == second_budget and first_budget['limit'] == 'max_states'
+    assert match_service.compiles == 2
+    assert len(match_service._failures) == 2
+
+def test_transient_failures_are_not_remembered(monkeypatch):
+    def out_of_memory(regex, minimize, budget):
+        raise MemoryError
+    match_service = MatchService(jobs=0)
+    monkeypatch.setattr(service, '_compile_worker', out_of_memory)
+    response, = asyncio.run(answers(match_service, ['{"op": "compile", "regex": "ab"}']))
+    assert not response['ok'] and 'MemoryError' in response['error']
+    assert not match_service._failures
+
+    monkeypatch.undo()
+    response, = asyncio.run(answers(match_service, ['{"op": "match", "regex": "ab", "text": "ab"}']))
+    assert response == {'ok': True, 'match': True}
+
+def test_broken_pool_is_replaced_once():
+    match_service = MatchService(jobs=1)
+    broken = match_service._executor = BrokenPool()
+    started = []
+    start = match_service.start
+    match_service.start = lambda: started.append(start())
+
+    async def compile_concurrently():
+        return await asyncio.gather(*(match_service.compiled(regex) for regex in ("a", "b", "c")),
+                                    return_exceptions=True)
+
+    try:
+        errors = asyncio.run(compile_concurrently())
+        assert all(isinstance(e, RequestError) and str(e) == "compile worker died" for e in errors)
+        assert len(started) == 1 and broken.shut_down
+        assert match_service._executor is not broken and match_service._executor is not None
+        assert not match_service._failures
+    finally:
+        match_service.close()
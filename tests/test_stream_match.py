@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from suites import ENTRIES, ENTRY_IDS, check
+from pattern_cache import compile_regex
+from stream_match import StreamMatcher, match_stream, match_file
+
+@pytest.mark.parametrize("name, regex, cases", ENTRIES, ids=ENTRY_IDS)
+def test_stream_matches_expected(name, regex, cases, tmp_path):
+    compiled = compile_regex(regex)
+    check(lambda text: match_stream(compiled, io.StringIO(text), chunk_size=2), cases)
+    # files are read as bytes, chunks of 2 bytes split multi-byte characters
+    path = tmp_path / "input.txt"
+    for text, expected in cases[:50]:
+        path.write_bytes(text.encode('utf-8'))
+        for use_mmap in (True, False):
+            assert match_file(compiled, str(path), use_mmap=use_mmap, chunk_size=2,
+                              encoding='utf-8') == expected, text
+
+class CountingReader(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+def test_reading_stops_in_the_dead_state():
+    stream = CountingReader(b"x" + b"a" * 10000)
+    assert not match_stream(compile_regex("a*"), stream, chunk_size=100)
+    assert stream.reads == 1
+
+def test_feed_chunks():
+    matcher = StreamMatcher(compile_regex("(ab)*c"))
+    for chunk in ("a", "ba", "b", ""):
+        assert matcher.feed(chunk)
+    assert not matcher.finish()
+    matcher.feed(b"c")  # bytes without an encoding are latin-1
+    assert matcher.finish() and matcher.consumed == 5
+    matcher.reset()
+    assert not matcher.feed("d") and matcher.dead
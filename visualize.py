@@ -0,0 +1,63 @@
+# visualization/export of NFAs and DFAs as Graphviz DOT source.
+# the DOT text is built by hand, the graphviz package is only imported by render()
+# (it is optional and slow to import), so the compile and match modules never load it.
+from typing import Dict, List, Optional
+
+from char_class import Symbol
+from nfa_builder import NFA
+from nfa_to_dfa import DFA
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def _label(symbols: List[Symbol]) -> str:
+    return ",".join(str(symbol) for symbol in symbols)
+
+def _graph(name: str, num_states: int, start: int, accepting, edges: Dict[tuple, List[Symbol]]) -> str:
+    # edges: (source, target) -> labels, merged into a single edge per state pair
+    lines = [f"digraph {name} {{", "  rankdir=LR;", '  "" [shape=none];']
+    for state in range(num_states):
+        shape = "doublecircle" if state in accepting else "circle"
+        lines.append(f'  {state} [shape={shape}];')
+    lines.append(f'  "" -> {start};')
+    for (source, target), labels in edges.items():
+        lines.append(f"  {source} -> {target} [label={_quote(_label(labels))}];")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def nfa_to_dot(nfa: NFA, name: str = "NFA") -> str:
+    edges: Dict[tuple, List[Symbol]] = {}
+    for source, state in enumerate(nfa.states):
+        for symbol, destinations in state.transitions.items():
+            for target in sorted(destinations):
+                edges.setdefault((source, target), []).append(symbol)
+    return _graph(name, len(nfa.states), nfa.start_state, nfa.accepting_states, edges)
+
+def dfa_to_dot(dfa: DFA, name: str = "DFA") -> str:
+    edges: Dict[tuple, List[Symbol]] = {}
+    for source, state in enumerate(dfa.states):
+        for symbol, target in state.transitions.items():
+            edges.setdefault((source, target), []).append(symbol)
+    return _graph(name, len(dfa.states), dfa.start_state, dfa.accepting_states, edges)
+
+def render(automaton, path: str, format: str = "png", name: Optional[str] = None) -> str:
+    # draw an NFA or DFA with graphviz (path without extension), returns the output file
+    try:
+        import graphviz
+    except ImportError as e:
+        raise ImportError("render() needs the graphviz package (pip install graphviz), "
+                          "nfa_to_dot/dfa_to_dot work without it") from e
+    if isinstance(automaton, NFA):
+        source = nfa_to_dot(automaton, name or "NFA")
+    else:
+        source = dfa_to_dot(automaton, name or "DFA")
+    return graphviz.Source(source).render(path, format=format, cleanup=True)
+
+if __name__ == "__main__":
+    from regex_to_postfix import regex_to_postfix
+    from nfa_builder import thompson_construction
+    from nfa_to_dfa import subset_construction
+
+    nfa = thompson_construction(regex_to_postfix("a(b|c)*"), arena=True)
+    print(nfa_to_dot(nfa))
+    print(dfa_to_dot(subset_construction(nfa)))